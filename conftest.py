@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def budget_test_environment(django_test_environment):
+    """Окружение BudgetTestRunner и под pytest: бюджеты запросов валят
+    тесты, кеш и KVStore миниатюр — во временном каталоге.
+    """
+    from core.testing import TestEnvironment
+
+    # Фикстура mock_media удаляет MEDIA_ROOT сразу после теста, а фоновый
+    # поток миниатюр успел бы писать в него.
+    environment = TestEnvironment(THUMBNAIL_ASYNC=False)
+    environment.enable()
+    yield
+    environment.disable()
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+
+CACHE_KEY = "auth_user:{}"
+
+
+def _key(user_id):
+    return CACHE_KEY.format(user_id)
+
+
+def remember(user):
+    """Кладет в кеш поля пользователя, без связанных объектов."""
+    values = {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+    }
+    cache.set(_key(user.pk), values, settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+def forget(user_id):
+    cache.delete(_key(user_id))
+
+
+def forget_many(user_ids):
+    """Сбрасывает кеш после QuerySet.update(), который не шлет сигналов."""
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берет пользователя запроса из кеша.
+
+    AuthenticationMiddleware вызывает get_user на каждом запросе, и без
+    кеша это SELECT по auth_user. Сохранение пользователя (в том числе
+    смена пароля и last_login при входе) сразу перезаписывает кеш,
+    поэтому проверка хеша пароля в сессии видит новый пароль.
+
+    QuerySet.update() сигналов не шлет: после массовой правки (is_active,
+    сброс паролей) нужен forget_many(ids), иначе старые поля живут до
+    AUTH_USER_CACHE_TIMEOUT.
+    """
+
+    def get_user(self, user_id):
+        model = get_user_model()
+        values = cache.get(_key(user_id))
+        if values is None:
+            try:
+                user = model._default_manager.get(pk=user_id)
+            except model.DoesNotExist:
+                return None
+            remember(user)
+        else:
+            user = model.from_db(
+                DEFAULT_DB_ALIAS, list(values), list(values.values())
+            )
+        return user if self.user_can_authenticate(user) else None
+
+
+def user_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # У загруженного через only() пользователя недостающие поля
+    # пришлось бы дочитывать из базы.
+    if instance.get_deferred_fields():
+        forget(instance.pk)
+    else:
+        remember(instance)
+
+
+def user_deleted(sender, instance, **kwargs):
+    forget(instance.pk)
+
+
+def connect():
+    model = get_user_model()
+    post_save.connect(user_saved, sender=model)
+    post_delete.connect(user_deleted, sender=model)
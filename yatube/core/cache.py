@@ -0,0 +1,184 @@
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import (
+    get_cache_key,
+    has_vary_header,
+    learn_cache_key,
+    patch_cache_control,
+    patch_response_headers,
+)
+
+from . import metrics
+
+LOCK_POLL_INTERVAL = 0.05
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def get_stats():
+    """Счётчики процесса: hit, miss, stale, refresh, wait."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def lock_key(request, key_prefix):
+    """Блокировка пересчёта той копии страницы, которую ищет запрос.
+
+    Копии различаются по заголовкам Vary (Cookie), поэтому ключ берется
+    из ключа кеша, а пока список заголовков не известен — из адреса.
+    """
+    key = get_cache_key(request, key_prefix, "GET", cache)
+    digest = hashlib.md5(
+        (key or request.build_absolute_uri()).encode()
+    ).hexdigest()
+    return f"page_lock.{key_prefix}.{digest}"
+
+
+def _needs_refresh(expires, delta, beta):
+    """Вероятностное досрочное обновление (XFetch): чем ближе срок
+    и чем дольше строилась страница, тем выше шанс пересчёта.
+    """
+    jitter = -delta * beta * math.log(1.0 - random.random())
+    return time.time() + jitter >= expires
+
+
+def _is_cacheable(request, response):
+    if response.streaming or response.status_code != 200:
+        return False
+    if "private" in response.get("Cache-Control", ""):
+        return False
+    return not (
+        not request.COOKIES
+        and response.cookies
+        and has_vary_header(response, "Cookie")
+    )
+
+
+def _served(response, event):
+    _count(event)
+    metrics.cache_event("page", event)
+    response["X-Cache"] = event
+    return response
+
+
+def _fetch(request, key_prefix):
+    key = get_cache_key(request, key_prefix, "GET", cache)
+    return cache.get(key) if key else None
+
+
+def _wait_for(request, key_prefix, lock, lock_timeout):
+    """Ждет копию, пока держат блокировку; после снятия — не дольше."""
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = _fetch(request, key_prefix)
+        if entry is not None:
+            return entry
+        if not cache.has_key(lock):
+            return None
+    return None
+
+
+def _store(
+    request, response, delta, timeout, stale_timeout, key_prefix, max_age
+):
+    if not _is_cacheable(request, response):
+        return
+    # Сброс по версиям работает только на сервере: браузерам и прокси
+    # можно держать копию не дольше max_age, а с cookie — только свою.
+    patch_response_headers(response, max_age)
+    if request.COOKIES:
+        patch_cache_control(response, private=True)
+    key = learn_cache_key(
+        request, response, timeout + stale_timeout, key_prefix, cache
+    )
+    cache.set(
+        key,
+        (response, time.time() + timeout, delta),
+        timeout + stale_timeout,
+    )
+
+
+def _lookup(request, key_prefix, lock, lock_timeout, beta):
+    """Возвращает (ответ из кеша или None, событие, взята ли блокировка)."""
+    entry = _fetch(request, key_prefix)
+    if entry is not None:
+        response, expires, delta = entry
+        if not _needs_refresh(expires, delta, beta):
+            return response, "hit", False
+        if not cache.add(lock, 1, lock_timeout):
+            return response, "stale", False
+        return None, "refresh", True
+    if cache.add(lock, 1, lock_timeout):
+        return None, "miss", True
+    entry = _wait_for(request, key_prefix, lock, lock_timeout)
+    if entry is not None:
+        return entry[0], "wait", False
+    return None, "miss", False
+
+
+def cache_page(
+    timeout,
+    *,
+    key_prefix="",
+    stale_timeout=60,
+    lock_timeout=10,
+    beta=1.0,
+    max_age=0,
+):
+    """Замена django.views.decorators.cache.cache_page с защитой
+    от одновременного пересчёта.
+
+    Страницу пересобирает только обладатель блокировки, остальные
+    получают устаревшую копию, которая хранится ещё stale_timeout
+    секунд после истечения timeout. Клиентам в Cache-Control уходит
+    max_age, а не timeout.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            lock = lock_key(request, key_prefix)
+            cached, event, locked = _lookup(
+                request, key_prefix, lock, lock_timeout, beta
+            )
+            if cached is not None:
+                return _served(cached, event)
+            try:
+                started = time.monotonic()
+                response = view(request, *args, **kwargs)
+                if not getattr(response, "is_rendered", True):
+                    response.render()
+                delta = time.monotonic() - started
+                _store(
+                    request,
+                    response,
+                    delta,
+                    timeout,
+                    stale_timeout,
+                    key_prefix,
+                    max_age,
+                )
+            finally:
+                if locked:
+                    cache.delete(lock)
+            return _served(response, event)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,463 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+GENERATION_KEY = "two_tier_generation"
+# Раз в столько записей SQLiteCache чистит просроченное и лишнее.
+CULL_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+) WITHOUT ROWID
+"""
+ALIVE = "(expires IS NULL OR expires > ?)"
+
+_MISSING = object()
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite (LOCATION), общий для процессов одного хоста.
+
+    Устроен как KVStore миниатюр: WAL и свое соединение на поток.
+    add() атомарен и между процессами, поэтому на нем держатся
+    блокировки cache_page. Каждые CULL_EVERY записей удаляется
+    просроченное, а при переполнении MAX_ENTRIES — 1/CULL_FREQUENCY
+    записей с ближайшим сроком.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key, value, timeout):
+        return (
+            key,
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            self.get_backend_timeout(timeout),
+        )
+
+    def _written(self, connection, count=1):
+        before, self._writes = self._writes, self._writes + count
+        if before // CULL_EVERY == self._writes // CULL_EVERY:
+            return
+        connection.execute(
+            "DELETE FROM cache WHERE expires <= ?", (time.time(),)
+        )
+        (total,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if total <= self._max_entries:
+            return
+        frequency = self._cull_frequency
+        connection.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+            "ORDER BY expires IS NULL, expires LIMIT ?)",
+            (total // frequency if frequency else total,),
+        )
+
+    def get(self, key, default=None, version=None):
+        row = (
+            self._connection()
+            .execute(
+                f"SELECT value FROM cache WHERE key = ? AND {ALIVE}",
+                (self._key(key, version), time.time()),
+            )
+            .fetchone()
+        )
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        if not names:
+            return {}
+        marks = ", ".join("?" * len(names))
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({marks}) "
+            f"AND {ALIVE}",
+            (*names, time.time()),
+        )
+        return {names[key]: pickle.loads(value) for key, value in rows}
+
+    def has_key(self, key, version=None):
+        row = (
+            self._connection()
+            .execute(
+                f"SELECT 1 FROM cache WHERE key = ? AND {ALIVE}",
+                (self._key(key, version), time.time()),
+            )
+            .fetchone()
+        )
+        return row is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) "
+            "VALUES (?, ?, ?)",
+            self._row(self._key(key, version), value, timeout),
+        )
+        self._written(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = [
+            self._row(self._key(key, version), value, timeout)
+            for key, value in data.items()
+        ]
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            self._written(connection, len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Записывает, только если ключа нет или он просрочен."""
+        connection = self._connection()
+        cursor = connection.execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE "
+            "SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires <= ?",
+            (*self._row(self._key(key, version), value, timeout), time.time()),
+        )
+        if cursor.rowcount:
+            self._written(connection)
+        return bool(cursor.rowcount)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection().execute(
+            f"UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}",
+            (
+                self.get_backend_timeout(timeout),
+                self._key(key, version),
+                time.time(),
+            ),
+        )
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно и между процессами, в отличие от BaseCache.incr."""
+        name = self._key(key, version)
+        with self._transaction() as connection:
+            row = connection.execute(
+                f"SELECT value FROM cache WHERE key = ? AND {ALIVE}",
+                (name, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                "UPDATE cache SET value = ? WHERE key = ?",
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), name),
+            )
+        return value
+
+    def delete(self, key, version=None):
+        cursor = self._connection().execute(
+            "DELETE FROM cache WHERE key = ?", (self._key(key, version),)
+        )
+        return bool(cursor.rowcount)
+
+    def delete_many(self, keys, version=None):
+        with self._transaction() as connection:
+            connection.executemany(
+                "DELETE FROM cache WHERE key = ?",
+                [(self._key(key, version),) for key in keys],
+            )
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+
+class LocalTier:
+    """LRU процесса на max_entries записей со своими сроками жизни.
+
+    Сверяет поколение с общим кешем не чаще раза в check_interval
+    секунд и при смене поколения очищается целиком.
+    """
+
+    def __init__(self, max_entries, check_interval):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._generation = _MISSING
+        self._checked = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def sync(self, read_generation):
+        now = time.monotonic()
+        checked = self._checked
+        if checked is not None and now - checked < self.check_interval:
+            return
+        generation = read_generation()
+        with self._lock:
+            self._checked = now
+            # До первой сверки в L1 только то, что процесс сам записал.
+            previous, self._generation = self._generation, generation
+            if previous is not _MISSING and previous != generation:
+                if self._data:
+                    self._stats["l1_flush"] += 1
+                self._data.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats["l1_evict"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def count(self, event):
+        with self._lock:
+            self._stats[event] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["l1_size"] = len(self._data)
+        return stats
+
+
+# Как у LocMemCache: обработчик caches создает бэкенд на каждый поток,
+# а L1 должен быть общим для потоков процесса.
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """Кеш в два уровня: LRU процесса (L1) перед общим кешем (L2).
+
+    L2 — другой псевдоним из CACHES (OPTIONS["L2"]): SQLiteCache на
+    одном хосте, memcached или redis на нескольких. Записи идут в оба
+    уровня, add() и incr() решает L2. В L1 значения лежат pickle-копиями
+    не дольше L1_TIMEOUT секунд. Ключи, которые меняются на месте,
+    ограничиваются L1_PREFIX_TIMEOUTS: {префикс: секунды}, 0 — мимо L1.
+
+    Удаление ключа из L1 и clear() меняют поколение в L2, и другие
+    процессы очищают свой L1 при ближайшей сверке (L1_CHECK_INTERVAL).
+    Поэтому удаления видны везде не позже чем через эту паузу, а
+    перезапись того же ключа — через срок жизни в L1.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._l2_alias = options["L2"]
+        self._l1_timeout = options.get("L1_TIMEOUT", 60)
+        self._prefix_timeouts = tuple(
+            options.get("L1_PREFIX_TIMEOUTS", {}).items()
+        )
+        with _tiers_lock:
+            if name not in _tiers:
+                _tiers[name] = LocalTier(
+                    options.get("L1_MAX_ENTRIES", 1000),
+                    options.get("L1_CHECK_INTERVAL", 1),
+                )
+            self._l1 = _tiers[name]
+
+    @property
+    def _l2(self):
+        return caches[self._l2_alias]
+
+    def _version(self, version):
+        return self.version if version is None else version
+
+    def _ttl(self, key, timeout=None):
+        """Сколько секунд ключ может жить в L1; 0 — не класть в L1."""
+        ttl = self._l1_timeout
+        for prefix, limit in self._prefix_timeouts:
+            if key.startswith(prefix):
+                ttl = min(ttl, limit)
+                break
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is not None:
+            ttl = min(ttl, timeout)
+        return max(ttl, 0)
+
+    def _count(self, tier, result):
+        self._l1.count(f"{tier}_{result}")
+        metrics.cache_event(tier, result)
+
+    def _read_generation(self):
+        return self._l2.get(GENERATION_KEY)
+
+    def _local(self, key, version):
+        """Значение из L1 или _MISSING; для ключей мимо L1 — сразу _MISSING."""
+        if not self._ttl(key):
+            return _MISSING
+        self._l1.sync(self._read_generation)
+        pickled = self._l1.get(self.make_key(key, version))
+        if pickled is None:
+            self._count("l1", "miss")
+            return _MISSING
+        self._count("l1", "hit")
+        return pickle.loads(pickled)
+
+    def _remember(self, key, version, value, timeout=None):
+        local_key = self.make_key(key, version)
+        ttl = self._ttl(key, timeout)
+        if ttl:
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            self._l1.set(local_key, pickled, ttl)
+        else:
+            self._l1.delete(local_key)
+
+    def _forget(self, keys, version):
+        """Убирает ключи из своего L1 и, если они там бывают, из чужих."""
+        shared = False
+        for key in keys:
+            self._l1.delete(self.make_key(key, version))
+            shared = shared or bool(self._ttl(key))
+        if shared:
+            self._l2.set(GENERATION_KEY, time.time_ns(), None)
+
+    def get(self, key, default=None, version=None):
+        version = self._version(version)
+        value = self._local(key, version)
+        if value is not _MISSING:
+            return value
+        value = self._l2.get(key, _MISSING, version)
+        if value is _MISSING:
+            self._count("l2", "miss")
+            return default
+        self._count("l2", "hit")
+        self._remember(key, version, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        version = self._version(version)
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._local(key, version)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            fetched = self._l2.get_many(missing, version)
+            for key in missing:
+                if key in fetched:
+                    self._count("l2", "hit")
+                    self._remember(key, version, fetched[key])
+                else:
+                    self._count("l2", "miss")
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        version = self._version(version)
+        if self._local(key, version) is not _MISSING:
+            return True
+        return self._l2.has_key(key, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        self._l2.set(key, value, timeout, version)
+        self._remember(key, version, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        failed = self._l2.set_many(data, timeout, version)
+        for key, value in data.items():
+            if key not in failed:
+                self._remember(key, version, value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        added = self._l2.add(key, value, timeout, version)
+        if added:
+            self._remember(key, version, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._l2.touch(key, timeout, self._version(version))
+
+    def incr(self, key, delta=1, version=None):
+        version = self._version(version)
+        value = self._l2.incr(key, delta, version)
+        self._forget([key], version)
+        return value
+
+    def delete(self, key, version=None):
+        version = self._version(version)
+        result = self._l2.delete(key, version)
+        self._forget([key], version)
+        return result
+
+    def delete_many(self, keys, version=None):
+        version = self._version(version)
+        self._l2.delete_many(keys, version)
+        self._forget(keys, version)
+
+    def clear(self):
+        self._l2.clear()
+        self._l1.clear()
+        self._l2.set(GENERATION_KEY, time.time_ns(), None)
+
+    def get_stats(self):
+        """Счетчики процесса по уровням: l1_hit, l2_miss, l1_evict и т.д."""
+        return self._l1.get_stats()
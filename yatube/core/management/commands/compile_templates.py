@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.templates import compile_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Разбирает все шаблоны и сообщает о синтаксических ошибках. "
+        "Запускается при выкладке, до переключения трафика."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        compiled, errors = compile_all()
+        elapsed = (time.perf_counter() - started) * 1000
+        for name, error in errors:
+            self.stderr.write(f"{name}: {error}")
+        self.stdout.write(f"Шаблонов: {compiled}, {elapsed:.0f} мс")
+        if errors:
+            raise CommandError(f"Шаблонов с ошибками: {len(errors)}")
@@ -0,0 +1,75 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def aggregate(lines, since=None):
+    """Сводка лога по fingerprint: число, суммарное и худшее время."""
+    groups = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if since is not None and parse_datetime(record["time"]) < since:
+            continue
+        group = groups.setdefault(
+            record["fingerprint"],
+            {
+                "sql": record["sql"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "views": set(),
+                "plan": None,
+            },
+        )
+        group["count"] += 1 + record.get("suppressed", 0)
+        group["total_ms"] += record["duration_ms"]
+        group["total_ms"] += record.get("suppressed_ms", 0.0)
+        group["max_ms"] = max(group["max_ms"], record["duration_ms"])
+        group["views"].add(record["view"] or "-")
+        group["plan"] = record["plan"] or group["plan"]
+    return sorted(
+        groups.items(), key=lambda item: item[1]["total_ms"], reverse=True
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Топ запросов из лога медленных запросов (SLOW_QUERY_LOG) "
+        "по суммарному времени, с планом EXPLAIN."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default=settings.SLOW_QUERY_LOG)
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument(
+            "--since", help="Только записи не раньше даты ISO 8601."
+        )
+
+    def handle(self, *args, log, top, since, **options):
+        if since is not None:
+            since = parse_datetime(since)
+            if since is None:
+                raise CommandError("--since: ожидается дата ISO 8601.")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        try:
+            with open(log) as file:
+                groups = aggregate(file, since)
+        except FileNotFoundError:
+            raise CommandError(f"Лог {log} не найден.")
+        for fingerprint, group in groups[:top]:
+            self.stdout.write(
+                f"{fingerprint} всего {group['total_ms']:.0f} мс, "
+                f"{group['count']} раз, максимум {group['max_ms']:.0f} мс, "
+                f"view: {', '.join(sorted(group['views']))}\n"
+                f"  {group['sql']}"
+            )
+            for step in group["plan"] or ():
+                marker = "!" if step.startswith("SCAN") else " "
+                self.stdout.write(f"  {marker} {step}")
@@ -0,0 +1,250 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.db import connection
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "yatube_"
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+HISTOGRAMS = {
+    "request_duration_seconds": ("Время ответа.", TIME_BUCKETS),
+    "db_duration_seconds": ("Время SQL-запросов ответа.", TIME_BUCKETS),
+    "db_queries": ("SQL-запросов за ответ.", COUNT_BUCKETS),
+    "template_duration_seconds": ("Время рендеринга шаблонов.", TIME_BUCKETS),
+    "response_bytes": ("Размер тела ответа.", SIZE_BUCKETS),
+}
+COUNTERS = {
+    "cache_requests_total": "Обращения к кешу страниц (page), карточек "
+    "(card) и уровням кеша (l1, l2) по результату.",
+}
+
+
+def _merge(target, shard):
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            current = target.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+class Registry:
+    """Гистограммы и счетчики процесса без блокировок на запись.
+
+    Каждый поток пишет только в свой shard(), блокировка берется лишь
+    при первом обращении потока и при чтении. При чтении shard-ы
+    складываются, а shard-ы завершившихся потоков сливаются в общий
+    retired, чтобы их число не росло с каждым потоком runserver.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def observe(self, name, labels, value, shard=None):
+        buckets = HISTOGRAMS[name][1]
+        if shard is None:
+            shard = self.shard()
+        values = shard.get((name, labels))
+        if values is None:
+            # Счетчики корзин, последняя — +Inf, и сумма значений.
+            values = shard[(name, labels)] = [0] * (len(buckets) + 2)
+        values[bisect_left(buckets, value)] += 1
+        values[-1] += value
+
+    def inc(self, name, labels, amount=1):
+        shard = self.shard()
+        shard[(name, labels)] = shard.get((name, labels), 0) + amount
+
+    def collect(self):
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    _merge(self._retired, shard)
+            self._shards = alive
+            totals = {}
+            _merge(totals, self._retired)
+            for _, shard in alive:
+                _merge(totals, shard)
+        return totals
+
+    def clear(self):
+        with self._lock:
+            for _, shard in self._shards:
+                shard.clear()
+            self._retired.clear()
+
+
+registry = Registry()
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _histogram_lines(name, labels, values):
+    buckets = HISTOGRAMS[name][1]
+    cumulative = 0
+    for bound, count in zip(buckets + ("+Inf",), values):
+        cumulative += count
+        le = _labels(labels, le=bound)
+        yield f"{PREFIX}{name}_bucket{le} {cumulative}"
+    yield f"{PREFIX}{name}_sum{_labels(labels)} {values[-1]}"
+    yield f"{PREFIX}{name}_count{_labels(labels)} {cumulative}"
+
+
+def render():
+    """Метрики процесса в текстовом формате Prometheus."""
+    totals = registry.collect()
+    lines = []
+    for name, (help_text, _) in HISTOGRAMS.items():
+        lines += [
+            f"# HELP {PREFIX}{name} {help_text}",
+            f"# TYPE {PREFIX}{name} histogram",
+        ]
+        for (metric, labels), values in sorted(totals.items()):
+            if metric == name:
+                lines.extend(_histogram_lines(name, labels, values))
+    for name, help_text in COUNTERS.items():
+        lines += [
+            f"# HELP {PREFIX}{name} {help_text}",
+            f"# TYPE {PREFIX}{name} counter",
+        ]
+        for (metric, labels), value in sorted(totals.items()):
+            if metric == name:
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    """Замеры одного запроса; пишутся из того же потока.
+
+    Сам себе контекстный менеджер: на время запроса ставится в
+    execute_wrappers соединения и становится текущим для потока.
+    """
+
+    __slots__ = (
+        "db_time",
+        "queries",
+        "template_time",
+        "template_depth",
+        "cache",
+    )
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def __enter__(self):
+        _current.stats = self
+        connection.execute_wrappers.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection.execute_wrappers.remove(self)
+        _current.stats = None
+
+
+_current = threading.local()
+
+
+@contextmanager
+def template_timer():
+    """Время рендеринга; вложенные шаблоны входят во внешний."""
+    stats = getattr(_current, "stats", None)
+    if stats is None:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_time += time.perf_counter() - started
+
+
+def cache_event(cache, result):
+    stats = getattr(_current, "stats", None)
+    if stats is not None:
+        key = (cache, result)
+        stats.cache[key] = stats.cache.get(key, 0) + 1
+
+
+def record(view, elapsed, stats, size=None):
+    labels = (("view", view),)
+    shard = registry.shard()
+    observe = registry.observe
+    observe("request_duration_seconds", labels, elapsed, shard)
+    observe("db_duration_seconds", labels, stats.db_time, shard)
+    observe("db_queries", labels, stats.queries, shard)
+    observe("template_duration_seconds", labels, stats.template_time, shard)
+    if size is not None:
+        observe("response_bytes", labels, size, shard)
+    for (cache, result), count in stats.cache.items():
+        registry.inc(
+            "cache_requests_total",
+            labels + (("cache", cache), ("result", result)),
+            count,
+        )
+
+
+def server_timing(elapsed, stats):
+    parts = [
+        f"total;dur={elapsed * 1000:.1f}",
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+        f"tpl;dur={stats.template_time * 1000:.1f}",
+    ]
+    if stats.cache:
+        events = " ".join(
+            f"{cache}-{result}={count}"
+            for (cache, result), count in sorted(stats.cache.items())
+        )
+        parts.append(f'cache;desc="{events}"')
+    return ", ".join(parts)
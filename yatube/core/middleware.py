@@ -0,0 +1,114 @@
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, profiling, queries, slow_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Сверяет число SQL-запросов страницы с QUERY_BUDGETS и ищет N+1.
+
+    При QUERY_BUDGET_ACTION = "log" нарушения пишутся в лог, при "raise"
+    (так настраивает тестовый раннер) запрос падает с QueryBudgetExceeded.
+    Запросы, которые делает потоковый ответ после выхода из view
+    (выгрузка export), сюда не попадают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET_ACTION:
+            return self.get_response(request)
+        with queries.recording() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None:
+            return response
+        found = queries.problems(match.view_name, recorder)
+        if found and settings.QUERY_BUDGET_ACTION == "raise":
+            raise queries.QueryBudgetExceeded("\n".join(found))
+        for problem in found:
+            logger.warning(problem)
+        return response
+
+
+class MetricsMiddleware:
+    """Время ответа, SQL, шаблоны, кеш и размер ответа по имени view.
+
+    Стоит первым в MIDDLEWARE, чтобы время включало остальные слои.
+    При DEBUG добавляет заголовок Server-Timing для devtools браузера.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with metrics.RequestStats() as stats:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unresolved"
+        size = None if response.streaming else len(response.content)
+        metrics.record(view, elapsed, stats, size)
+        if settings.DEBUG:
+            response["Server-Timing"] = metrics.server_timing(elapsed, stats)
+        return response
+
+
+class SlowQueryMiddleware:
+    """Подписывает записи лога медленных запросов именем view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.set_view(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slow_queries.set_view(request.resolver_match.view_name)
+
+
+class ProfilingMiddleware:
+    """Профилирует долю PROFILING_SAMPLE_RATE запросов и запросы staff
+    с ?_profile=1 (или =cprofile, =sample для выбора движка).
+
+    При PROFILING_ENABLED = False выключается целиком через
+    MiddlewareNotUsed и ничего не стоит. Имя файла профиля — в заголовке
+    X-Profile, список файлов — на странице /debug/profiles/.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        engine = self._engine(request)
+        if engine is None:
+            return self.get_response(request)
+        response, name = profiling.profile(engine, self.get_response, request)
+        response["X-Profile"] = name
+        return response
+
+    def _engine(self, request):
+        requested = request.GET.get("_profile")
+        if requested and request.user.is_staff:
+            if requested in profiling.EXTENSIONS:
+                return requested
+            return settings.PROFILING_ENGINE
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return settings.PROFILING_ENGINE
+        return None
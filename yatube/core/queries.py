@@ -0,0 +1,79 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.utils.text import Truncator
+
+IN_LIST_RE = re.compile(r"IN \((?:%s, )*%s\)")
+# Строки многострочного INSERT из bulk_create после первой.
+ROWS_RE = re.compile(
+    r"(?:, \((?:%s, )*%s\))+|(?: UNION ALL SELECT (?:%s, )*%s)+"
+)
+NUMBER_RE = re.compile(r"\b\d+\b")
+# Длина SQL в сообщении о повторах.
+MESSAGE_SQL_LENGTH = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Запрос к странице сделал больше SQL, чем разрешено бюджетом."""
+
+
+def shape(sql):
+    """SQL без значений: запросы, разные только параметрами, совпадут.
+
+    Параметры Django и так передает отдельно, здесь дополнительно
+    схлопываются списки IN (%s, ...), строки пакетного INSERT
+    (VALUES (...), (...) и SELECT %s UNION ALL SELECT %s) и числа
+    вроде LIMIT 21.
+    """
+    sql = ROWS_RE.sub(" ...", IN_LIST_RE.sub("IN (...)", sql))
+    return NUMBER_RE.sub("N", sql)
+
+
+def is_batch_insert(sql):
+    """Пакет bulk_create: несколько строк одним INSERT, а не N+1."""
+    return sql.lstrip().upper().startswith("INSERT") and bool(
+        ROWS_RE.search(sql)
+    )
+
+
+class QueryRecorder:
+    """Собирает SQL соединения через execute_wrapper, без DEBUG=True."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def repeated(self, limit):
+        """Формы запросов, выполненные limit и более раз: похоже на N+1."""
+        counts = Counter(
+            shape(sql) for sql in self.queries if not is_batch_insert(sql)
+        )
+        return {sql: count for sql, count in counts.items() if count >= limit}
+
+
+@contextmanager
+def recording():
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+
+
+def problems(view_name, recorder):
+    """Нарушения бюджета QUERY_BUDGETS и повторы запросов для страницы."""
+    found = []
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    if budget is not None and len(recorder.queries) > budget:
+        found.append(
+            f"{view_name}: {len(recorder.queries)} SQL-запросов "
+            f"при бюджете {budget}"
+        )
+    for sql, count in recorder.repeated(settings.QUERY_REPEAT_LIMIT).items():
+        sql = Truncator(sql).chars(MESSAGE_SQL_LENGTH)
+        found.append(f"{view_name}: {count} раз {sql}")
+    return found
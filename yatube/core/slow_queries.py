@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .queries import shape
+
+logger = logging.getLogger(__name__)
+
+_context = threading.local()
+
+# Django называет точки сохранения уникально: s<поток>_x<номер>.
+SAVEPOINT_RE = re.compile(r'SAVEPOINT "[^"]+"')
+
+
+def set_view(view_name):
+    """Имя view для записей лога; None — запрос вне HTTP (команды)."""
+    _context.view = view_name
+
+
+def fingerprint(sql):
+    normalized = SAVEPOINT_RE.sub('SAVEPOINT "…"', shape(sql))
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+class Sampler:
+    """Пропускает не больше одной записи на fingerprint за interval секунд.
+
+    Пропущенные запросы не теряются для отчета: их число и время
+    добавляются к следующей записи того же fingerprint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def take(self, key, duration, interval):
+        now = time.monotonic()
+        with self._lock:
+            last, count, total = self._state.get(key, (None, 0, 0.0))
+            if last is not None and now - last < interval:
+                self._state[key] = (last, count + 1, total + duration)
+                return None
+            self._state[key] = (now, 0, 0.0)
+            return count, total
+
+    def clear(self):
+        with self._lock:
+            self._state.clear()
+
+
+sampler = Sampler()
+
+
+def explain(connection, sql, params):
+    """План запроса через курсор драйвера, мимо execute_wrappers.
+
+    Так EXPLAIN не попадает ни в метрики, ни в бюджеты запросов.
+    """
+    prefix = (
+        "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.cursor.execute(prefix + sql, params)
+            # В SQLite текст шага — последний столбец, в остальных базах
+            # строка плана и так одна.
+            return [str(row[-1]) for row in cursor.cursor.fetchall()]
+    except (DatabaseError, connection.Database.Error):
+        return None
+
+
+def wrapper_for(connection):
+    def log_slow_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+                _log(connection, sql, params, many, duration)
+
+    return log_slow_query
+
+
+def _log(connection, sql, params, many, duration):
+    key, normalized = fingerprint(sql)
+    sampled = sampler.take(key, duration, settings.SLOW_QUERY_SAMPLE_INTERVAL)
+    if sampled is None:
+        return
+    suppressed, suppressed_ms = sampled
+    is_select = sql.lstrip().upper().startswith("SELECT")
+    record = {
+        "time": timezone.now().isoformat(),
+        "view": getattr(_context, "view", None),
+        "duration_ms": round(duration, 3),
+        "fingerprint": key,
+        "sql": normalized,
+        "suppressed": suppressed,
+        "suppressed_ms": round(suppressed_ms, 3),
+        "plan": (
+            explain(connection, sql, params)
+            if is_select and not many
+            else None
+        ),
+    }
+    logger.warning(json.dumps(record, ensure_ascii=False))
+
+
+def install(sender=None, connection=None, **kwargs):
+    """Ставит лог медленных запросов на новое соединение (connection_created).
+
+    Список execute_wrappers живет в объекте соединения и переживает
+    переподключение, поэтому повторно обертка не добавляется.
+    """
+    if getattr(connection, "_slow_query_wrapper", None) is None:
+        connection._slow_query_wrapper = wrapper_for(connection)
+        connection.execute_wrappers.insert(0, connection._slow_query_wrapper)
@@ -0,0 +1,76 @@
+import os
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+def _dirs(loaders):
+    for loader in loaders:
+        if hasattr(loader, "loaders"):
+            yield from _dirs(loader.loaders)
+        elif hasattr(loader, "get_dirs"):
+            yield from loader.get_dirs()
+
+
+def template_names(engine):
+    """Имена всех шаблонов, которые видят загрузчики движка."""
+    names = []
+    seen = set()
+    for directory in _dirs(engine.engine.template_loaders):
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, "/")
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+    return names
+
+
+def compile_all():
+    """Разбирает все шаблоны Django-движков.
+
+    Возвращает число разобранных шаблонов и список (имя, ошибка).
+    С кешированным загрузчиком разобранные шаблоны остаются в памяти
+    процесса, и первые запросы не тратят время на разбор.
+    """
+    compiled, errors = 0, []
+    for engine in engines.all():
+        if not hasattr(engine, "engine"):
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateSyntaxError, TemplateDoesNotExist) as error:
+                errors.append((name, error))
+            except UnicodeDecodeError:
+                continue
+            else:
+                compiled += 1
+    return compiled, errors
+
+
+def warm_up():
+    """Прогрев при старте воркера, если включен TEMPLATE_WARMUP."""
+    if getattr(settings, "TEMPLATE_WARMUP", False):
+        compile_all()
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with metrics.template_timer():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Движок Django, который сообщает время рендеринга в метрики."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestEnvironment:
+    """Настройки тестов, общие для manage.py test и pytest.
+
+    Превышение QUERY_BUDGETS — ошибка. Общий кеш (L2, в нем и сессии)
+    и KVStore миниатюр переживают процесс, поэтому тесты получают
+    их во временном каталоге и не трогают файлы разработчика.
+    overrides — дополнительные настройки для этого запуска.
+    """
+
+    def __init__(self, **overrides):
+        self.overrides = overrides
+
+    def enable(self):
+        self.directory = tempfile.mkdtemp(prefix="yatube-tests-")
+        caches_setting = {
+            **settings.CACHES,
+            "shared": {
+                **settings.CACHES["shared"],
+                "LOCATION": os.path.join(self.directory, "cache.sqlite3"),
+            },
+        }
+        self.override = override_settings(
+            QUERY_BUDGET_ACTION="raise",
+            CACHES=caches_setting,
+            THUMBNAIL_KVSTORE_PATH=os.path.join(
+                self.directory, "thumbnails.sqlite3"
+            ),
+            **self.overrides,
+        )
+        self.override.enable()
+        # L1 процесса живет дольше настроек, см. core.cache_backends.
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def disable(self):
+        self.override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class BudgetTestRunner(DiscoverRunner):
+    """Тестовый раннер с окружением TestEnvironment."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.environment = TestEnvironment()
+        self.environment.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.environment.disable()
+        super().teardown_test_environment(**kwargs)
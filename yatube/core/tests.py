@@ -1,6 +1,35 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from io import StringIO
 
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db.models import Q
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils.cache import patch_vary_headers
+
+from sorl.thumbnail.images import ImageFile
+
+from posts import urls as posts_urls
+from posts.models import Group, Post, User
+
+from . import auth, metrics, profiling, slow_queries
+from .cache import cache_page, get_stats, lock_key
+from .cache_backends import CULL_EVERY
+from .middleware import ProfilingMiddleware
+from .queries import QueryBudgetExceeded, problems, recording, shape
+from .templates import warm_up
+from .thumbnail_kvstore import KVStore
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +37,601 @@ class ViewTestClass(TestCase):
         response = self.client.get("/nonexist-page/")
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, "core/404.html")
+
+
+class CachePageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = 0
+
+    def slow_view(self, request):
+        self.calls += 1
+        time.sleep(0.2)
+        return HttpResponse(f"call {self.calls}")
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи пересчитывают страницу один раз."""
+        view = cache_page(60, key_prefix="test")(self.slow_view)
+        responses = []
+
+        def fetch():
+            responses.append(view(self.factory.get("/page/")))
+
+        threads = [threading.Thread(target=fetch) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({r.content for r in responses}, {b"call 1"})
+
+    def test_stale_copy_served_during_rebuild(self):
+        """Пока страницу пересобирают, остальным отдаётся старая копия."""
+        view = cache_page(0, key_prefix="test")(self.slow_view)
+        request = self.factory.get("/page/")
+        view(request)
+        cache.add(lock_key(request, "test"), 1)
+        before = get_stats().get("stale", 0)
+        response = view(self.factory.get("/page/"))
+        self.assertEqual(response.content, b"call 1")
+        self.assertEqual(response["X-Cache"], "stale")
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(get_stats()["stale"], before + 1)
+
+    def test_fresh_copy_is_hit(self):
+        view = cache_page(60, key_prefix="test")(self.slow_view)
+        self.assertEqual(view(self.factory.get("/page/"))["X-Cache"], "miss")
+        self.assertEqual(view(self.factory.get("/page/"))["X-Cache"], "hit")
+        self.assertEqual(self.calls, 1)
+
+    def cookie_request(self, session):
+        request = self.factory.get("/page/")
+        request.COOKIES["sessionid"] = session
+        request.META["HTTP_COOKIE"] = f"sessionid={session}"
+        return request
+
+    def personal_view(self, request):
+        response = self.slow_view(request)
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    def test_other_users_rebuild_does_not_block(self):
+        """Копии с разными Cookie пересчитываются под разными блокировками."""
+        view = cache_page(0, key_prefix="test", lock_timeout=5)(
+            self.personal_view
+        )
+        view(self.cookie_request("first"))
+        cache.add(lock_key(self.cookie_request("first"), "test"), 1)
+        started = time.monotonic()
+        response = view(self.cookie_request("second"))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.content, b"call 2")
+
+    def test_wait_ends_when_lock_released(self):
+        view = cache_page(60, key_prefix="test", lock_timeout=5)(
+            self.personal_view
+        )
+        request = self.cookie_request("first")
+        lock = lock_key(request, "test")
+        cache.add(lock, 1)
+        threading.Timer(0.1, cache.delete, (lock,)).start()
+        started = time.monotonic()
+        response = view(request)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.content, b"call 1")
+
+    def test_clients_get_short_max_age(self):
+        """Долгий срок только у копии на сервере, клиенты перезапрашивают."""
+        view = cache_page(3600, key_prefix="test", max_age=5)(self.slow_view)
+        response = view(self.factory.get("/page/"))
+        self.assertEqual(response["Cache-Control"], "max-age=5")
+        request = self.factory.get("/private/")
+        request.COOKIES["sessionid"] = "session"
+        response = view(request)
+        self.assertIn("private", response["Cache-Control"])
+
+
+class ThumbnailKVStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(
+            THUMBNAIL_KVSTORE_PATH=os.path.join(directory, "kv.sqlite3")
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_store_is_shared_between_instances(self):
+        """Метаданные видны другому экземпляру (процессу) без хранилища."""
+        image = ImageFile("cache/ab/cd/thumb.jpg")
+        image.set_size((960, 339))
+        KVStore().set(image)
+        store = KVStore()
+        cached = store.get(image)
+        self.assertEqual(cached.size, [960, 339])
+        self.assertIsNone(store.get(ImageFile("cache/missing.jpg")))
+        self.assertEqual(store.get_stats()["hit_ratio"], 0.5)
+        store.get(image)
+        self.assertEqual(store.get_stats()["l1_hit"], 1)
+        store.delete(image)
+        self.assertIsNone(KVStore().get(image))
+
+    @override_settings(THUMBNAIL_KVSTORE_L1_CHECK_INTERVAL=0)
+    def test_delete_clears_l1_of_other_instances(self):
+        image = ImageFile("cache/ab/cd/thumb.jpg")
+        image.set_size((960, 339))
+        store = KVStore()
+        store.set(image)
+        store.get(image)
+        KVStore().delete(image)
+        self.assertIsNone(store.get(image))
+
+
+class TwoTierCacheTests(TestCase):
+    """Два экземпляра TwoTierCache с разными L1 — как два процесса."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, "cache.sqlite3")
+
+    def use(self, **options):
+        tier = {
+            "BACKEND": "core.cache_backends.TwoTierCache",
+            "OPTIONS": {"L2": "l2", "L1_CHECK_INTERVAL": 0, **options},
+        }
+        override = override_settings(
+            CACHES={
+                **settings.CACHES,
+                "l2": {
+                    "BACKEND": "core.cache_backends.SQLiteCache",
+                    "LOCATION": self.path,
+                    "OPTIONS": {"MAX_ENTRIES": 10, "CULL_FREQUENCY": 2},
+                },
+                "a": {**tier, "LOCATION": f"{self.id()}.a"},
+                "b": {**tier, "LOCATION": f"{self.id()}.b"},
+            }
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        return caches["a"], caches["b"]
+
+    def test_tiers_and_copies(self):
+        first, second = self.use()
+        first.set("key", {"text": "Пост"})
+        value = first.get("key")
+        value["text"] = "Изменено"
+        self.assertEqual(first.get("key"), {"text": "Пост"})
+        self.assertEqual(
+            second.get_many(["key", "missing"]), {"key": {"text": "Пост"}}
+        )
+        second.get("key")
+        self.assertEqual(
+            second.get_stats(),
+            {
+                "l1_hit": 1,
+                "l1_miss": 2,
+                "l2_hit": 1,
+                "l2_miss": 1,
+                "l1_size": 1,
+            },
+        )
+        self.assertEqual(first.get_stats()["l1_hit"], 2)
+
+    def test_delete_reaches_other_processes(self):
+        first, second = self.use()
+        first.set("key", "Пост")
+        self.assertEqual(second.get("key"), "Пост")
+        first.delete("key")
+        self.assertIsNone(second.get("key"))
+        self.assertEqual(second.get_stats()["l1_flush"], 1)
+
+    def test_prefix_timeouts(self):
+        first, second = self.use(L1_PREFIX_TIMEOUTS={"lock.": 0})
+        self.assertTrue(first.add("lock.page", 1))
+        self.assertFalse(second.add("lock.page", 1))
+        first.set("lock.page", 2)
+        self.assertEqual(second.get("lock.page"), 2)
+        first.delete("lock.page")
+        self.assertTrue(second.add("lock.page", 1))
+        self.assertEqual(second.get_stats(), {"l2_hit": 1, "l1_size": 0})
+
+    def test_l1_is_bounded(self):
+        first, _ = self.use(L1_MAX_ENTRIES=2)
+        first.set_many({"a": 1, "b": 2, "c": 3})
+        self.assertEqual(first.get("a"), 1)
+        stats = first.get_stats()
+        self.assertEqual(stats["l1_evict"], 2)
+        self.assertEqual(stats["l2_hit"], 1)
+        self.assertEqual(stats["l1_size"], 2)
+
+    def test_shared_tier(self):
+        self.use()
+        shared = caches["l2"]
+        shared.set("short", 1, 0.01)
+        time.sleep(0.02)
+        self.assertFalse(shared.has_key("short"))
+        self.assertTrue(shared.add("short", 2))
+        self.assertEqual(shared.incr("short", 3), 5)
+        with self.assertRaises(ValueError):
+            shared.incr("missing")
+        keys = [f"key{number}" for number in range(CULL_EVERY)]
+        for key in keys:
+            shared.set(key, key)
+        found = shared.get_many(keys)
+        self.assertLess(len(found), CULL_EVERY)
+        self.assertIn(keys[-1], found)
+
+
+CACHED_TEMPLATES = [
+    {
+        **settings.TEMPLATES[0],
+        "APP_DIRS": False,
+        "OPTIONS": {
+            **settings.TEMPLATES[0]["OPTIONS"],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
+        },
+    },
+]
+
+
+class CompileTemplatesTests(TestCase):
+    def test_all_templates_compile(self):
+        out = StringIO()
+        call_command("compile_templates", stdout=out)
+        self.assertIn("Шаблонов:", out.getvalue())
+
+    def test_broken_template_fails_command(self):
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, "broken.html"), "w") as file:
+            file.write("{% block content %}")
+        templates = [{**settings.TEMPLATES[0], "DIRS": [directory]}]
+        with override_settings(TEMPLATES=templates):
+            with self.assertRaises(CommandError):
+                call_command(
+                    "compile_templates", stdout=StringIO(), stderr=StringIO()
+                )
+
+    @override_settings(TEMPLATES=CACHED_TEMPLATES, TEMPLATE_WARMUP=True)
+    def test_warm_up_fills_cached_loader(self):
+        loader = engines["django"].engine.template_loaders[0]
+        self.assertEqual(loader.get_template_cache, {})
+        warm_up()
+        self.assertIn("posts/index.html", loader.get_template_cache)
+        self.assertIn("includes/header.html", loader.get_template_cache)
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        group = Group.objects.create(title="Группа", slug="group")
+        for i in range(3):
+            Post.objects.create(author=cls.author, group=group, text=f"{i}")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tests_use_temporary_cache_files(self):
+        self.assertEqual(settings.QUERY_BUDGET_ACTION, "raise")
+        for path in (
+            settings.CACHES["shared"]["LOCATION"],
+            settings.THUMBNAIL_KVSTORE_PATH,
+        ):
+            self.assertFalse(path.startswith(str(settings.BASE_DIR)), path)
+
+    def test_every_posts_view_has_budget(self):
+        names = {f"posts:{p.name}" for p in posts_urls.urlpatterns}
+        self.assertLessEqual(names, set(settings.QUERY_BUDGETS))
+
+    def test_shape_ignores_parameters(self):
+        self.assertEqual(
+            shape('SELECT * FROM "t" WHERE "id" IN (%s, %s) LIMIT 21'),
+            shape('SELECT * FROM "t" WHERE "id" IN (%s) LIMIT 1'),
+        )
+
+    def test_shape_folds_batch_inserts(self):
+        rows = 'INSERT INTO "t" ("a", "b") SELECT %s, %s'
+        self.assertEqual(
+            shape(rows + " UNION ALL SELECT %s, %s" * 2),
+            shape(rows + " UNION ALL SELECT %s, %s"),
+        )
+        self.assertEqual(
+            shape('INSERT INTO "t" ("a") VALUES (%s), (%s), (%s)'),
+            shape('INSERT INTO "t" ("a") VALUES (%s), (%s)'),
+        )
+
+    def test_batch_inserts_are_not_repeats(self):
+        with recording() as recorder:
+            for i in range(settings.QUERY_REPEAT_LIMIT):
+                Group.objects.bulk_create(
+                    Group(title=str(i), slug=f"batch-{i}-{n}")
+                    for n in range(2)
+                )
+        self.assertEqual(recorder.repeated(settings.QUERY_REPEAT_LIMIT), {})
+
+    @override_settings(QUERY_REPEAT_LIMIT=2)
+    def test_repeated_sql_truncated_in_message(self):
+        with recording() as recorder:
+            for _ in range(2):
+                terms = [Q(text=str(i)) for i in range(50)]
+                Post.objects.filter(Q(*terms, _connector=Q.OR)).exists()
+        [message] = problems("posts:index", recorder)
+        self.assertLess(len(message), 400)
+
+    def test_repeated_queries_are_reported(self):
+        with recording() as recorder:
+            for post in Post.objects.all():
+                post.group.title
+        repeated = recorder.repeated(settings.QUERY_REPEAT_LIMIT)
+        self.assertEqual(list(repeated.values()), [3])
+        self.assertIn('FROM "posts_group"', next(iter(repeated)))
+
+    @override_settings(QUERY_BUDGETS={"posts:index": 1})
+    def test_budget_fails_tests(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "posts:index"):
+            self.client.get("/")
+
+    @override_settings(
+        QUERY_BUDGETS={"posts:index": 1}, QUERY_BUDGET_ACTION="log"
+    )
+    def test_budget_logs_in_development(self):
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            response = self.client.get("/")
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn("при бюджете 1", logs.output[0])
+
+
+class AuthCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="reader", password="1")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.client.get("/follow/")
+
+    def test_no_session_or_user_queries(self):
+        with recording() as recorder:
+            response = self.client.get("/follow/")
+        self.assertEqual(response.wsgi_request.user, self.user)
+        for sql in recorder.queries:
+            with self.subTest(sql=sql):
+                self.assertNotRegex(
+                    sql, r'FROM "(django_session|auth_user)" WHERE'
+                )
+
+    def test_user_save_updates_cache(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Читатель"
+        user.save()
+        request = self.client.get("/").wsgi_request
+        self.assertEqual(request.user.first_name, "Читатель")
+        user.is_active = False
+        user.save()
+        request = self.client.get("/").wsgi_request
+        self.assertFalse(request.user.is_authenticated)
+
+    def test_bulk_update_with_forget_many(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        auth.forget_many([self.user.pk])
+        request = self.client.get("/").wsgi_request
+        self.assertFalse(request.user.is_authenticated)
+
+    def test_password_change_ends_other_sessions(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password("2")
+        user.save()
+        request = self.client.get("/").wsgi_request
+        self.assertFalse(request.user.is_authenticated)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+        Post.objects.create(author=cls.staff, text="Пост")
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def test_metrics_for_staff_only(self):
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.staff)
+        self.client.get("/")
+        response = self.client.get("/metrics/")
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        for line in (
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 1',
+            'yatube_template_duration_seconds_count{view="posts:index"} 1',
+            'yatube_response_bytes_count{view="posts:index"} 1',
+            'yatube_cache_requests_total{view="posts:index",cache="page",'
+            'result="miss"} 1',
+            'yatube_cache_requests_total{view="posts:index",cache="card",'
+            'result="miss"} 1',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, body)
+
+    def test_server_timing_in_debug(self):
+        self.assertNotIn("Server-Timing", self.client.get("/"))
+        with self.settings(DEBUG=True):
+            cache.clear()
+            response = self.client.get("/")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", '
+            r"tpl;dur=[\d.]+, cache;desc=",
+        )
+
+    def test_finished_threads_are_merged(self):
+        labels = (("view", "test"),)
+        threads = [
+            threading.Thread(
+                target=metrics.registry.observe,
+                args=("request_duration_seconds", labels, 0.02),
+            )
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        totals = metrics.registry.collect()
+        values = totals[("request_duration_seconds", labels)]
+        self.assertEqual(sum(values[:-1]), 3)
+        self.assertAlmostEqual(values[-1], 0.06)
+        self.assertEqual(metrics.registry.collect(), totals)
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username="author")
+        Post.objects.create(author=author, text="Пост")
+
+    def setUp(self):
+        cache.clear()
+        slow_queries.sampler.clear()
+
+    def records(self, logs):
+        return [json.loads(line.split(":", 2)[2]) for line in logs.output]
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_logged_with_view_and_plan(self):
+        with self.assertLogs("core.slow_queries", "WARNING") as logs:
+            self.client.get("/")
+        records = self.records(logs)
+        posts = [r for r in records if 'FROM "posts_post"' in r["sql"]]
+        self.assertTrue(posts)
+        self.assertEqual(posts[0]["view"], "posts:index")
+        self.assertTrue(posts[0]["plan"])
+        self.assertNotIn("%s", " ".join(posts[0]["plan"]))
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_same_fingerprint_is_sampled(self):
+        with self.assertLogs("core.slow_queries", "WARNING") as logs:
+            for _ in range(3):
+                list(Post.objects.filter(text="Пост"))
+        records = self.records(logs)
+        self.assertEqual(len(records), 1)
+        with self.settings(SLOW_QUERY_SAMPLE_INTERVAL=0):
+            with self.assertLogs("core.slow_queries", "WARNING") as logs:
+                list(Post.objects.filter(text="Пост"))
+        self.assertEqual(self.records(logs)[0]["suppressed"], 2)
+
+    def test_report_orders_by_total_time(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "slow.log")
+        records = [
+            ("a", "SELECT a", 300, 0, 0, ["SCAN posts_comment"]),
+            ("b", "SELECT b", 200, 4, 800, ["SEARCH posts_post"]),
+            ("a", "SELECT a", 100, 0, 0, None),
+        ]
+        with open(path, "w") as file:
+            for key, sql, duration, count, hidden, plan in records:
+                record = {
+                    "time": "2026-01-01T00:00:00+00:00",
+                    "view": "posts:index",
+                    "duration_ms": duration,
+                    "fingerprint": key,
+                    "sql": sql,
+                    "suppressed": count,
+                    "suppressed_ms": hidden,
+                    "plan": plan,
+                }
+                file.write(json.dumps(record) + "\n")
+        out = StringIO()
+        call_command("slow_query_report", "--log", path, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("b всего 1000 мс, 5 раз"))
+        self.assertIn("a всего 400 мс, 2 раз", out.getvalue())
+        self.assertIn("! SCAN posts_comment", out.getvalue())
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+        cls.user = User.objects.create_user(username="user")
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(
+            PROFILING_ENABLED=True, PROFILING_DIR=self.directory
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.staff)
+
+    def test_disabled_middleware_is_not_used(self):
+        with self.settings(PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: HttpResponse())
+
+    def test_staff_profile_request(self):
+        response = self.client.get("/?_profile=cprofile")
+        name = response["X-Profile"]
+        self.assertRegex(name, r"-posts_index-\d+ms\.pstats$")
+        stats = pstats.Stats(os.path.join(self.directory, name))
+        self.assertGreater(stats.total_calls, 0)
+        self.client.force_login(self.user)
+        response = self.client.get("/?_profile=1")
+        self.assertFalse(response.has_header("X-Profile"))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_KEEP=2)
+    def test_sampled_requests_rotate(self):
+        for _ in range(3):
+            self.client.get("/about/author/")
+        names = [name for name, _ in profiling.listing()]
+        self.assertEqual(len(names), 2)
+        self.assertTrue(all(name.endswith(".collapsed") for name in names))
+
+    def test_stack_sampler_collapses_stacks(self):
+        sampler = profiling.StackSampler(0.001)
+        sampler.enable()
+        time.sleep(0.05)
+        sampler.disable()
+        path = os.path.join(self.directory, "stacks.collapsed")
+        sampler.dump_stats(path)
+        with open(path) as file:
+            stack, count = file.readline().rsplit(" ", 1)
+        self.assertTrue(stack.endswith(".test_stack_sampler_collapses_stacks"))
+        self.assertGreater(int(count), 0)
+
+    def test_profiles_pages(self):
+        name = self.client.get("/?_profile=1")["X-Profile"]
+        response = self.client.get("/debug/profiles/")
+        self.assertContains(response, name)
+        response = self.client.get(f"/debug/profiles/{name}")
+        self.assertEqual(
+            response["Content-Disposition"], f'attachment; filename="{name}"'
+        )
+        response = self.client.get("/debug/profiles/..%2Fdb.sqlite3")
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.client.force_login(self.user)
+        response = self.client.get("/debug/profiles/")
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
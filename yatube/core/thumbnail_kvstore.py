@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+from .cache_backends import LocalTier
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kvstore (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS generation (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    value INTEGER NOT NULL
+);
+"""
+
+
+class KVStore(KVStoreBase):
+    """KVStore sorl-thumbnail в файле SQLite.
+
+    Файл общий для всех процессов хоста и переживает перезапуск,
+    поэтому метаданные миниатюр (имя и размеры) не приходится
+    заново узнавать у хранилища. Найденные значения держит L1 процесса
+    (как TwoTierCache). Запись и удаление меняют поколение в файле,
+    и другие процессы очищают свой L1.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._l1 = LocalTier(
+            settings.THUMBNAIL_KVSTORE_L1_ENTRIES,
+            settings.THUMBNAIL_KVSTORE_L1_CHECK_INTERVAL,
+        )
+
+    def _connection(self):
+        path = settings.THUMBNAIL_KVSTORE_PATH
+        connections = self._local.__dict__.setdefault("connections", {})
+        if path not in connections:
+            connection = sqlite3.connect(
+                path, timeout=30, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            connections[path] = connection
+        return connections[path]
+
+    def _count(self, event):
+        with self._stats_lock:
+            self._stats[event] += 1
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats.get("hit", 0) + stats.get("miss", 0)
+        stats["hit_ratio"] = stats.get("hit", 0) / lookups if lookups else 0
+        stats.update(self._l1.get_stats())
+        return stats
+
+    def _read_generation(self):
+        row = (
+            self._connection()
+            .execute("SELECT value FROM generation WHERE id = 1")
+            .fetchone()
+        )
+        return row and row[0]
+
+    def _get_raw(self, key):
+        # В L1 ключ вместе с файлом: в тестах путь к файлу меняется.
+        local_key = (settings.THUMBNAIL_KVSTORE_PATH, key)
+        self._l1.sync(self._read_generation)
+        value = self._l1.get(local_key)
+        if value is not None:
+            self._count("hit")
+            self._count("l1_hit")
+            return value
+        row = (
+            self._connection()
+            .execute("SELECT value FROM kvstore WHERE key = ?", (key,))
+            .fetchone()
+        )
+        self._count("miss" if row is None else "hit")
+        if row is None:
+            return None
+        self._l1.set(local_key, row[0], settings.THUMBNAIL_CACHE_TIMEOUT)
+        return row[0]
+
+    def _changed(self, connection):
+        """Новое поколение: другие процессы очистят свой L1."""
+        connection.execute(
+            "INSERT OR REPLACE INTO generation (id, value) VALUES (1, ?)",
+            (time.time_ns(),),
+        )
+
+    def _set_raw(self, key, value):
+        # Список миниатюр источника sorl дописывает чтением и записью,
+        # поэтому L1 должен сразу видеть новое значение.
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO kvstore (key, value) VALUES (?, ?)",
+            (key, value),
+        )
+        self._changed(connection)
+        self._l1.set(
+            (settings.THUMBNAIL_KVSTORE_PATH, key),
+            value,
+            settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+
+    def _delete_raw(self, *keys):
+        connection = self._connection()
+        connection.executemany(
+            "DELETE FROM kvstore WHERE key = ?", [(key,) for key in keys]
+        )
+        self._changed(connection)
+        for key in keys:
+            self._l1.delete((settings.THUMBNAIL_KVSTORE_PATH, key))
+
+    def _find_keys_raw(self, prefix):
+        rows = self._connection().execute(
+            "SELECT key FROM kvstore WHERE substr(key, 1, ?) = ?",
+            (len(prefix), prefix),
+        )
+        return [row[0] for row in rows]
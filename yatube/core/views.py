@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics, profiling
+
 
 def page_not_found(request, exception):
     return render(
@@ -24,3 +28,23 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=""):
     return render(request, "core/403csrf.html")
+
+
+@staff_member_required
+def metrics_view(request):
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@staff_member_required
+def profiles(request):
+    return render(
+        request, "core/profiles.html", {"profiles": profiling.listing()}
+    )
+
+
+@staff_member_required
+def profile_download(request, name):
+    path = profiling.path_for(name)
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=name)
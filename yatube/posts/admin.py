@@ -1,14 +1,33 @@
 from django.contrib import admin
 
+from . import search
 from .models import Group, Post
+from .paginators import EstimatedCountPaginator
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ("pk", "text", "pub_date", "author", "group")
     search_fields = ("text",)
     list_editable = ("group",)
+    list_select_related = ("author", "group")
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Варианты групп читаются один раз, а не в каждой строке списка."""
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == "group":
+            field.choices = list(field.choices)
+        return field
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE '%...%' по text."""
+        expression = search.build_query(search_term)
+        if not expression:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=search.matching(expression)), False
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,131 @@
+import calendar
+import hashlib
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+
+from constants import POSTS_PER_PAGE
+
+from . import cache
+from .models import Group, Post, User
+from .paginators import CursorPaginator
+
+API_VERSION = "v1"
+FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "author__username",
+    "group__slug",
+    "image",
+    "comments_count",
+)
+
+
+def serialize(row):
+    return {
+        "id": row["id"],
+        "text": row["text"],
+        "pub_date": row["pub_date"],
+        "author": row["author__username"],
+        "group": row["group__slug"],
+        "image": default_storage.url(row["image"]) if row["image"] else None,
+        "comments_count": row["comments_count"],
+    }
+
+
+def feed_etag(request, scope):
+    """ETag из версий кеша ленты: меняется при любой правке в ней.
+
+    Версии читаются из кеша, поэтому проверка If-None-Match обходится
+    без запросов к базе.
+    """
+    versions = cache.get_versions(cache.GLOBAL_SCOPE, scope)
+    raw = "|".join([API_VERSION, *map(str, versions), request.GET.urlencode()])
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def latest_pub_date(queryset):
+    latest = queryset.aggregate(latest=Max("pub_date"))["latest"]
+    if latest is None:
+        return None
+    return calendar.timegm(latest.utctimetuple())
+
+
+def conditional_feed(scope, lookups):
+    """Отвечает 304 по ETag или Last-Modified до выборки ленты.
+
+    scope — область кеша ленты, lookups — фильтр постов ленты; оба
+    заполняются аргументами из URL.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            etag = feed_etag(request, scope.format(**kwargs))
+            posts = Post.objects.filter(
+                **{key: value.format(**kwargs) for key, value in lookups}
+            )
+            last_modified = None
+            if "HTTP_IF_NONE_MATCH" not in request.META:
+                last_modified = latest_pub_date(posts)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if last_modified is None:
+                    last_modified = latest_pub_date(posts)
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def feed_response(request, queryset):
+    paginator = CursorPaginator(queryset.values(*FIELDS), POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get("cursor"))
+    links = {}
+    for name in ("next", "previous"):
+        cursor = getattr(page, f"{name}_cursor")
+        links[name] = (
+            request.build_absolute_uri(f"{request.path}?cursor={cursor}")
+            if cursor
+            else None
+        )
+    return JsonResponse(
+        {"results": [serialize(row) for row in page], **links},
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+@require_GET
+@conditional_feed("index", ())
+def posts(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_GET
+@conditional_feed("group:{slug}", (("group__slug", "{slug}"),))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, Post.objects.filter(group=group))
+
+
+@require_GET
+@conditional_feed("profile:{username}", (("author__username", "{username}"),))
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, Post.objects.filter(author=author))
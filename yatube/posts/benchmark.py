@@ -0,0 +1,150 @@
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import urls
+from .models import Follow, Group, Post, User
+from .seed import STAFF_USERNAME
+
+# Разница во времени меньше этой считается шумом, а не регрессией.
+MIN_DELTA_MS = 2.0
+
+
+def sample_kwargs():
+    """Значения параметров URL: самые «тяжелые» группа, автор и пост."""
+    group = (
+        Group.objects.annotate(total=Count("posts")).order_by("-total").first()
+    )
+    author = (
+        User.objects.filter(stats__isnull=False)
+        .order_by("-stats__posts_count")
+        .first()
+    )
+    post = Post.objects.order_by("-comments_count").first()
+    return {
+        "slug": group.slug if group else "missing",
+        "username": author.username if author else STAFF_USERNAME,
+        "post_id": post.id if post else 0,
+        "kind": "posts",
+    }
+
+
+def targets():
+    """Имя и путь для каждого маршрута posts/urls.py."""
+    values = sample_kwargs()
+    for pattern in urls.urlpatterns:
+        kwargs = {name: values[name] for name in pattern.pattern.converters}
+        yield pattern.name, reverse(f"posts:{pattern.name}", kwargs=kwargs)
+
+
+def percentile(timings, percent):
+    if len(timings) < 2:
+        return timings[0]
+    return statistics.quantiles(timings, n=100, method="inclusive")[
+        percent - 1
+    ]
+
+
+def fetch(client, path):
+    """Запрос целиком, включая тело потокового ответа (export)."""
+    response = client.get(path)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def allocated_kib(client, path):
+    tracemalloc.start()
+    try:
+        fetch(client, path)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def measure(client, path, repeat, cold=False):
+    """Время (p50/p95), число запросов и пик выделенной памяти для path.
+
+    Первый запрос прогревает кеши и не учитывается. Память меряется
+    отдельным запросом: tracemalloc заметно замедляет код.
+    """
+    response = fetch(client, path)
+    timings, queries = [], 0
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            fetch(client, path)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(context.captured_queries))
+    return {
+        "path": path,
+        "status": response.status_code,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "queries": queries,
+        "alloc_kib": round(allocated_kib(client, path), 1),
+    }
+
+
+def client_for(anonymous):
+    client = Client()
+    if not anonymous:
+        user, _ = User.objects.get_or_create(
+            username=STAFF_USERNAME, defaults={"is_staff": True}
+        )
+        client.force_login(user)
+    return client
+
+
+def run(repeat=20, only=None, anonymous=False, cold=False):
+    client = client_for(anonymous)
+    views = {}
+    for name, path in targets():
+        if only and name not in only:
+            continue
+        views[name] = measure(client, path, repeat, cold)
+    return {
+        "meta": {
+            "repeat": repeat,
+            "anonymous": anonymous,
+            "cold": cold,
+            "posts": Post.objects.count(),
+            "users": User.objects.count(),
+            "follows": Follow.objects.count(),
+        },
+        "views": views,
+    }
+
+
+def _worse(current, previous, threshold, slack=0.0):
+    return current > previous * (1 + threshold) + slack
+
+
+def regressions(current, baseline, threshold):
+    """Отличия прогона current от baseline, которые хуже порога."""
+    found = []
+    for name, now in current["views"].items():
+        before = baseline["views"].get(name)
+        if before is None:
+            continue
+        if now["queries"] > before["queries"]:
+            found.append(
+                f"{name}: запросов {before['queries']} → {now['queries']}"
+            )
+        for metric in ("p95_ms", "alloc_kib"):
+            slack = MIN_DELTA_MS if metric == "p95_ms" else 0.0
+            if _worse(now[metric], before[metric], threshold, slack):
+                found.append(
+                    f"{name}: {metric} {before[metric]} → {now[metric]}"
+                )
+    return found
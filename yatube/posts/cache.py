@@ -0,0 +1,88 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import cache_page
+
+from .models import Group
+
+GLOBAL_SCOPE = "*"
+VERSION_KEY = "feed_version:{}"
+
+
+def post_scopes(post, group_ids=()):
+    """Области лент, в которых выводится пост."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    slugs = Group.objects.filter(id__in=group_ids).values_list(
+        "slug", flat=True
+    )
+    return [
+        "index",
+        f"profile:{post.author.username}",
+        *(f"group:{slug}" for slug in slugs),
+    ]
+
+
+def card_scopes(post):
+    """Области, от которых зависит карточка: пост, автор, группа, картинка."""
+    return [
+        f"post:{post.id}",
+        f"user:{post.author_id}",
+        f"group_card:{post.group_id}",
+        f"image:{post.image.name}",
+    ]
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def get_versions(*scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    for key, version in missing.items():
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+        versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Делает недействительными закешированные страницы областей.
+
+    Версия не увеличивается, а заменяется новой: после вытеснения
+    ключа из кеша старые страницы не могут стать снова актуальными.
+    """
+    version = _new_version()
+    cache.set_many(
+        {VERSION_KEY.format(scope): version for scope in scopes}, None
+    )
+
+
+def cache_feed(scope):
+    """Кеширует страницу ленты под ключом с версией её области.
+
+    scope — шаблон имени области, заполняется аргументами из URL,
+    например "group:{slug}".
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            name = scope.format(**kwargs)
+            versions = get_versions(GLOBAL_SCOPE, name)
+            key_prefix = "{}.{}.{}".format(name, *versions)
+            cached_view = cache_page(
+                settings.FEED_CACHE_TIMEOUT,
+                key_prefix=key_prefix,
+                stale_timeout=settings.FEED_CACHE_STALE_TIMEOUT,
+                max_age=settings.FEED_BROWSER_MAX_AGE,
+            )(view)
+            return cached_view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,77 @@
+import threading
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache as fragment_cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import metrics
+
+from . import cache
+
+TEMPLATE = "posts/includes/post_card.html"
+KEY = "post_card:{}:{}"
+HEADER = "X-Card-Cache"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_stats():
+    """Счётчики процесса: hit, miss и доля попаданий hit_ratio."""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats.get("hit", 0) + stats.get("miss", 0)
+    stats["hit_ratio"] = stats.get("hit", 0) / total if total else 0.0
+    return stats
+
+
+def _count(event, request):
+    with _stats_lock:
+        _stats[event] += 1
+    metrics.cache_event("card", event)
+    if request is not None:
+        if not hasattr(request, "post_cards"):
+            request.post_cards = Counter()
+        request.post_cards[event] += 1
+
+
+def render(post, request=None):
+    """HTML карточки поста из кеша фрагментов.
+
+    Ключ содержит версии поста, автора и группы, поэтому правка
+    любого из них дает новый ключ, а старая карточка истекает сама.
+    Карточка не зависит от пользователя и общая для всех лент.
+    """
+    versions = cache.get_versions(*cache.card_scopes(post))
+    key = KEY.format(post.id, ".".join(map(str, versions)))
+    html = fragment_cache.get(key)
+    if html is None:
+        html = render_to_string(TEMPLATE, {"posts": post})
+        fragment_cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT)
+        _count("miss", request)
+    else:
+        _count("hit", request)
+    return mark_safe(html)
+
+
+def report_hit_rate(view):
+    """Добавляет к ответу число карточек из кеша и отрисованных заново.
+
+    Ставится над cache_feed: заголовок не сохраняется в кеше страниц, и
+    ответ из этого кеша приходит без него.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        counts = getattr(request, "post_cards", None)
+        if counts:
+            response[HEADER] = "hit={}; miss={}".format(
+                counts["hit"], counts["miss"]
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+USER_FIELDS = ("posts_count", "followers_count", "following_count")
+
+
+def change_user(user_id, **deltas):
+    """Сдвигает счётчики, не опуская ниже нуля (дрейф чинит reconcile).
+
+    Строка создаётся только для увеличения: если ее нет, уменьшать
+    нечего, а при удалении пользователя каскад удаляет ее раньше
+    его постов и подписок.
+    """
+    updates = {
+        field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()
+    }
+    if UserStats.objects.filter(user_id=user_id).update(**updates):
+        return
+    if any(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**updates)
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F("comments_count") + delta
+    )
+
+
+def for_user(user):
+    """Счётчики пользователя; нули, если строка ещё не создана."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def _grouped(queryset, field):
+    return dict(queryset.values_list(field).annotate(Count("id")).order_by())
+
+
+def reconcile():
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+    expected = {
+        "posts_count": _grouped(Post.objects, "author_id"),
+        "followers_count": _grouped(Follow.objects, "author_id"),
+        "following_count": _grouped(Follow.objects, "user_id"),
+    }
+    existing = UserStats.objects.in_bulk()
+    missing, changed = [], []
+    for user_id in User.objects.values_list("id", flat=True).iterator():
+        values = {
+            field: counts.get(user_id, 0) for field, counts in expected.items()
+        }
+        stats = existing.get(user_id)
+        if stats is None:
+            missing.append(UserStats(user_id=user_id, **values))
+        elif any(getattr(stats, f) != v for f, v in values.items()):
+            for field, value in values.items():
+                setattr(stats, field, value)
+            changed.append(stats)
+    batch_size = settings.COUNTERS_BATCH_SIZE
+    UserStats.objects.bulk_create(missing, batch_size=batch_size)
+    UserStats.objects.bulk_update(changed, USER_FIELDS, batch_size=batch_size)
+
+    comments = _grouped(Comment.objects, "post_id")
+    drifted = []
+    posts = Post.objects.only("id", "comments_count").order_by()
+    for post in posts.iterator():
+        actual = comments.get(post.id, 0)
+        if post.comments_count != actual:
+            post.comments_count = actual
+            drifted.append(post)
+    Post.objects.bulk_update(
+        drifted, ["comments_count"], batch_size=batch_size
+    )
+    return len(missing) + len(changed) + len(drifted)
@@ -0,0 +1,107 @@
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+
+Count = namedtuple("Count", "value exact capped", defaults=(True, False))
+
+CACHE_KEY = "count:{}"
+
+
+def _limited(queryset, limit):
+    """COUNT(*) по подзапросу с LIMIT: не дороже limit строк."""
+    return queryset[: limit + 1].count()
+
+
+def exact(queryset):
+    if isinstance(queryset, QuerySet):
+        return Count(queryset.count())
+    return Count(len(queryset))
+
+
+def capped(queryset):
+    """Точное число до порога, дальше — порог и признак capped."""
+    if not isinstance(queryset, QuerySet):
+        return exact(queryset)
+    limit = settings.POSTS_PAGINATION_COUNT_LIMIT
+    value = _limited(queryset, limit)
+    if value > limit:
+        return Count(limit, exact=False, capped=True)
+    return Count(value)
+
+
+def cached(queryset):
+    """Точное число до порога, дальше — COUNT(*) раз в POSTS_COUNT_TIMEOUT."""
+    if not isinstance(queryset, QuerySet):
+        return exact(queryset)
+    limit = settings.POSTS_PAGINATION_COUNT_LIMIT
+    value = _limited(queryset, limit)
+    if value <= limit:
+        return Count(value)
+    digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = CACHE_KEY.format(digest)
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, settings.POSTS_COUNT_TIMEOUT)
+    return Count(total, exact=False)
+
+
+def table_rows(model):
+    """Число строк таблицы по статистике ANALYZE (sqlite_stat1) или None."""
+    if connection.vendor != "sqlite":
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = %s",
+                [model._meta.db_table],
+            )
+            rows = [int(stat.split()[0]) for (stat,) in cursor.fetchall()]
+    except DatabaseError:
+        return None
+    return max(rows) if rows else None
+
+
+def estimated(queryset):
+    """Для всей таблицы — статистика ANALYZE, для выборок — кеш COUNT(*)."""
+    if not isinstance(queryset, QuerySet) or queryset.query.where:
+        return cached(queryset)
+    limit = settings.POSTS_PAGINATION_COUNT_LIMIT
+    value = _limited(queryset, limit)
+    if value <= limit:
+        return Count(value)
+    rows = table_rows(queryset.model)
+    if rows is None:
+        return cached(queryset)
+    return Count(max(rows, value), exact=False)
+
+
+def known(value):
+    """Число из таблицы счетчиков (UserStats) вместо COUNT(*).
+
+    Расхождение счетчиков с таблицей чинит reconcile_counters; число
+    сверх порога выводится как приблизительное.
+    """
+
+    def strategy(queryset):
+        return Count(
+            value, exact=value <= settings.POSTS_PAGINATION_COUNT_LIMIT
+        )
+
+    return strategy
+
+
+STRATEGIES = {
+    "exact": exact,
+    "capped": capped,
+    "cached": cached,
+    "estimated": estimated,
+}
+
+
+def get_strategy(name=None):
+    return STRATEGIES[name or settings.POSTS_COUNT_STRATEGY]
@@ -0,0 +1,100 @@
+import csv
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+
+EXPORTS = {
+    "posts": (
+        Post,
+        (
+            "id",
+            "pub_date",
+            "author_id",
+            "group_id",
+            "text",
+            "image",
+            "comments_count",
+        ),
+    ),
+    "comments": (
+        Comment,
+        ("id", "pub_date", "post_id", "author_id", "text"),
+    ),
+    "follows": (Follow, ("id", "user_id", "author_id")),
+}
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def rows(kind, since=None, since_id=None):
+    """Строки выгрузки по возрастанию id, без создания объектов моделей.
+
+    iterator() читает курсор порциями EXPORT_CHUNK_SIZE, поэтому память
+    не зависит от размера таблицы. since — нижняя граница pub_date,
+    since_id — последний id прошлой выгрузки.
+    """
+    model, fields = EXPORTS[kind]
+    queryset = model.objects.order_by("id")
+    if since is not None:
+        queryset = queryset.filter(pub_date__gte=since)
+    if since_id is not None:
+        queryset = queryset.filter(id__gt=since_id)
+    return queryset.values_list(*fields).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+
+
+class _Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(fields, values):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in values:
+        yield encoder.encode(dict(zip(fields, row))) + "\n"
+
+
+def csv_lines(fields, values):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in values:
+        yield writer.writerow(row)
+
+
+def batched(lines, size=64 * 1024):
+    """Склеивает строки в куски около size байт для записи и сжатия."""
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b"".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(kind, fmt="ndjson", since=None, since_id=None, gzip=False):
+    """Куски байтов выгрузки kind в формате fmt, при gzip — сжатые."""
+    fields = EXPORTS[kind][1]
+    lines = ndjson_lines if fmt == "ndjson" else csv_lines
+    chunks = batched(lines(fields, rows(kind, since, since_id)))
+    return gzipped(chunks) if gzip else chunks
@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache, counters, search, timeline
+from .models import Comment, Group, Post, User
+
+
+class Lookup:
+    """Карта ключ → id, которая дозагружает неизвестные ключи пачкой."""
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.ids = {}
+
+    def load(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if missing:
+            self.ids.update(
+                self.queryset.filter(
+                    **{f"{self.field}__in": missing}
+                ).values_list(self.field, "id")
+            )
+        return [key for key in missing if key not in self.ids]
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+def read_records(file, fmt):
+    """Записи из NDJSON или CSV по одной, без чтения файла целиком."""
+    if fmt == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_pub_date(value):
+    """Дата из ISO 8601; без часового пояса считается в TIME_ZONE."""
+    if not value:
+        return timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f"Неверная дата: {value}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Checkpoint:
+    """Число уже сохраненных записей входного файла.
+
+    Пишется после фиксации каждой пачки через временный файл и
+    os.replace, поэтому при обрыве остается последнее целое значение.
+    Если известны id записей, повтор пачки после сбоя ничего не
+    дублирует: вставка идет с ignore_conflicts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        if self.path is None or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as file:
+            return int(file.read().strip() or 0)
+
+    def write(self, done):
+        if self.path is None:
+            return
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(str(done))
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@contextmanager
+def keep_pub_date(*models):
+    """Отключает auto_now_add у pub_date, чтобы сохранить даты источника."""
+    fields = [model._meta.get_field("pub_date") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Массовая загрузка постов или комментариев.
+
+    Авторы и группы разрешаются через карты в памяти, вставка идет
+    bulk_create пачками по batch_size, каждая пачка в своей транзакции
+    (на отдельные INSERT ее делит Django по лимитам параметров SQLite).
+    Сигналы на каждую строку не срабатывают, а производные данные
+    (счетчики, поисковый индекс, ленты подписок) пересчитываются одним
+    проходом в finish().
+    """
+
+    def __init__(self, kind, batch_size, create_authors=False):
+        self.kind = kind
+        self.batch_size = batch_size
+        self.create_authors = create_authors
+        self.authors = Lookup(User.objects, "username")
+        self.groups = Lookup(Group.objects, "slug")
+        self.author_ids = set()
+        self.imported = 0
+        self.skipped = 0
+
+    def _author_id(self, record):
+        if record.get("author_id"):
+            return int(record["author_id"])
+        return self.authors.get(record.get("author"))
+
+    def _group_id(self, record):
+        if record.get("group_id"):
+            return int(record["group_id"])
+        slug = record.get("group")
+        if not slug:
+            return None
+        return self.groups.get(slug) or False
+
+    def _resolve(self, records):
+        missing = self.authors.load(r.get("author") for r in records)
+        if missing and self.create_authors:
+            User.objects.bulk_create(
+                (
+                    User(username=name, password=make_password(None))
+                    for name in missing
+                ),
+                ignore_conflicts=True,
+            )
+            self.authors.load(missing)
+        self.groups.load(r.get("group") for r in records)
+
+    def _build(self, record):
+        author_id = self._author_id(record)
+        text = record.get("text")
+        if not author_id or not text:
+            return None
+        fields = {
+            "id": int(record["id"]) if record.get("id") else None,
+            "author_id": author_id,
+            "text": text,
+            "pub_date": parse_pub_date(record.get("pub_date")),
+        }
+        if self.kind == "comments":
+            if not record.get("post_id"):
+                return None
+            return Comment(post_id=int(record["post_id"]), **fields)
+        group_id = self._group_id(record)
+        if group_id is False:
+            return None
+        return Post(
+            group_id=group_id, image=record.get("image") or "", **fields
+        )
+
+    def save_batch(self, records):
+        self._resolve(records)
+        objects = [self._build(record) for record in records]
+        objects = [obj for obj in objects if obj is not None]
+        self.skipped += len(records) - len(objects)
+        model = Comment if self.kind == "comments" else Post
+        with transaction.atomic(), keep_pub_date(model):
+            model.objects.bulk_create(
+                objects,
+                ignore_conflicts=all(obj.id for obj in objects),
+            )
+        self.author_ids.update(obj.author_id for obj in objects)
+        self.imported += len(objects)
+
+    def run(self, records, checkpoint, report=None):
+        """Загружает записи, продолжая с сохраненной контрольной точки."""
+        done = checkpoint.read()
+        records = islice(records, done, None)
+        started = time.perf_counter()
+        with search.deferred_index():
+            while True:
+                batch = list(islice(records, self.batch_size))
+                if not batch:
+                    break
+                self.save_batch(batch)
+                done += len(batch)
+                checkpoint.write(done)
+                if report is not None:
+                    report(done, self.imported / self._elapsed(started))
+        return done
+
+    @staticmethod
+    def _elapsed(started):
+        return max(time.perf_counter() - started, 1e-9)
+
+    def finish(self):
+        """Пересчитывает производные данные после загрузки."""
+        counters.reconcile()
+        if self.kind == "posts" and self.author_ids:
+            timeline.rebuild(
+                User.objects.filter(
+                    follower__author_id__in=self.author_ids
+                ).distinct()
+            )
+        cache.bump(cache.GLOBAL_SCOPE)
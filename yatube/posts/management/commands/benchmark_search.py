@@ -0,0 +1,50 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from constants import POSTS_PER_PAGE
+from posts import search
+from posts.models import Post
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время первой страницы поиска: LIKE '%...%' по "
+        "Post.text (как в админке раньше) и индекс FTS5."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("queries", nargs="+")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, queries, repeat, **options):
+        self.stdout.write(f"Постов: {Post.objects.count()}")
+        for query in queries:
+            like = Post.objects.filter(text__icontains=query).order_by(
+                "-pub_date", "-id"
+            )
+            paths = {
+                "LIKE": lambda: list(like[:POSTS_PER_PAGE]),
+                "FTS5 rank": lambda: list(
+                    search.search(query, POSTS_PER_PAGE)
+                ),
+                "FTS5 new": lambda: list(
+                    search.search(query, POSTS_PER_PAGE, order="new")
+                ),
+            }
+            for name, func in paths.items():
+                median, worst = timed(func, repeat)
+                self.stdout.write(
+                    f"{query!r} {name}: медиана {median:.2f} мс, "
+                    f"максимум {worst:.2f} мс"
+                )
@@ -0,0 +1,75 @@
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет все маршруты posts/urls.py тестовым клиентом и выводит "
+        "p50/p95, число SQL-запросов и пик памяти. С --baseline сравнивает "
+        "с сохраненным прогоном и падает при регрессиях. Сначала "
+        "проверяет планы запросов лент на данных бенчмарка."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--only", nargs="+", help="Имена маршрутов, например index."
+        )
+        parser.add_argument("--anonymous", action="store_true")
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Очищать кеш перед каждым запросом.",
+        )
+        parser.add_argument(
+            "--no-metrics",
+            action="store_true",
+            help="Выключить MetricsMiddleware, чтобы оценить ее накладные "
+            "расходы.",
+        )
+        parser.add_argument("--save", help="Записать результат в JSON.")
+        parser.add_argument("--baseline", help="JSON прошлого прогона.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Допустимый рост p95 и памяти, доля.",
+        )
+
+    def handle(self, *args, **options):
+        # На большом сиде после ANALYZE SQLite выбирает другие планы,
+        # чем на маленькой базе тестов.
+        if connection.vendor == "sqlite":
+            call_command("check_query_plans", stdout=self.stdout)
+        with override_settings(METRICS_ENABLED=not options["no_metrics"]):
+            result = benchmark.run(
+                options["repeat"],
+                options["only"],
+                options["anonymous"],
+                options["cold"],
+            )
+        for name, view in result["views"].items():
+            self.stdout.write(
+                f"{name:<18} {view['status']} p50 {view['p50_ms']:8.2f} мс "
+                f"p95 {view['p95_ms']:8.2f} мс "
+                f"запросов {view['queries']:3} "
+                f"память {view['alloc_kib']:8.1f} КиБ"
+            )
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump(result, file, indent=2, sort_keys=True)
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            found = benchmark.regressions(
+                result, baseline, options["threshold"]
+            )
+            if found:
+                raise CommandError("Регрессии:\n" + "\n".join(found))
+            self.stdout.write(self.style.SUCCESS("Регрессий нет."))
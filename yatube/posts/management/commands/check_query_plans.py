@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from constants import POSTS_PER_PAGE
+from posts import timeline
+from posts.models import Comment, Post, User
+from posts.paginators import KEYS, CursorPaginator
+
+SAMPLE_ID = 1
+
+
+def feed_queries():
+    user = User(id=SAMPLE_ID)
+    return {
+        "index": Post.objects.select_related("author", "group"),
+        "group_list": Post.objects.filter(group_id=SAMPLE_ID).select_related(
+            "author"
+        ),
+        "profile": Post.objects.filter(author_id=SAMPLE_ID).select_related(
+            "group"
+        ),
+        "follow_index": timeline.feed(user, celebrities=[]).select_related(
+            "author", "group"
+        ),
+        "follow_index_celebrities": timeline.feed(
+            user, celebrities=[SAMPLE_ID]
+        ).select_related("author", "group"),
+        "comments": Comment.objects.filter(post_id=SAMPLE_ID).select_related(
+            "author"
+        ),
+    }
+
+
+def cursor_queries():
+    """Запросы курсорной пагинации лент с ключом позиции каждой ленты."""
+    position = (timezone.now(), SAMPLE_ID)
+    queries = feed_queries()
+    keys = {
+        "index": KEYS,
+        "group_list": KEYS,
+        "profile": KEYS,
+        "follow_index": timeline.CURSOR_KEYS,
+        "follow_index_celebrities": timeline.CURSOR_KEYS,
+    }
+    return {
+        f"{name}_cursor": CursorPaginator(
+            queries[name], POSTS_PER_PAGE, cursor_keys
+        ).page_queryset(position)
+        for name, cursor_keys in keys.items()
+    }
+
+
+def plan_problems(plan):
+    """Строки плана с полным перебором таблицы или сортировкой в памяти."""
+    problems = []
+    for detail in plan:
+        full_scan = detail.startswith("SCAN") and "INDEX" not in detail
+        if full_scan or "TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+class Command(BaseCommand):
+    help = "Проверяет, что запросы лент используют индексы (только SQLite)."
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Проверка планов поддерживается для SQLite.")
+        failed = []
+        with connection.cursor() as cursor:
+            queries = {**feed_queries(), **cursor_queries()}
+            for name, queryset in queries.items():
+                sql, params = queryset[:POSTS_PER_PAGE].query.sql_with_params()
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plan = [row[-1] for row in cursor.fetchall()]
+                problems = plan_problems(plan)
+                status = "FAIL" if problems else "OK"
+                self.stdout.write(f"{status} {name}: {' | '.join(plan)}")
+                if problems:
+                    failed.append(name)
+        if failed:
+            raise CommandError(
+                "Запросы без индекса: {}".format(", ".join(failed))
+            )
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоково выгружает посты, комментарии или подписки в NDJSON или "
+        "CSV; память не зависит от числа строк."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            "--format", dest="fmt", choices=export.FORMATS, default="ndjson"
+        )
+        parser.add_argument(
+            "--since", help="Только записи с pub_date не раньше (ISO 8601)."
+        )
+        parser.add_argument(
+            "--since-id", type=int, help="Только записи с id больше этого."
+        )
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "--output", help="Файл для выгрузки, по умолчанию stdout."
+        )
+
+    def handle(self, *args, kind, fmt, since, since_id, gzip, output, **opts):
+        if since is not None:
+            since = parse_datetime(since)
+            if since is None:
+                raise CommandError("--since: ожидается дата в ISO 8601.")
+        if since is not None and kind == "follows":
+            raise CommandError(
+                "У подписок нет pub_date, используйте --since-id."
+            )
+        chunks = export.stream(kind, fmt, since, since_id, gzip)
+        if output is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        with open(output, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
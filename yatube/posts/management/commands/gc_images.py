@@ -0,0 +1,58 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет картинки постов и их миниатюры, на которые не ссылается "
+        "ни один пост."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help="Не трогать файлы моложе стольких секунд (идущие загрузки).",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def stored_files(self, storage, directory):
+        directories, files = storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name)
+        for subdirectory in directories:
+            yield from self.stored_files(
+                storage, os.path.join(directory, subdirectory)
+            )
+
+    def handle(self, *args, min_age, dry_run, **options):
+        field = Post._meta.get_field("image")
+        storage = field.storage
+        referenced = set(
+            Post.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        keep = set(referenced)
+        for name in referenced:
+            keep.update(thumbnails.thumbnail_names(name))
+        cutoff = time.time() - min_age
+        removed = 0
+        for name in self.stored_files(storage, field.upload_to.rstrip("/")):
+            if (
+                name in keep
+                or storage.get_modified_time(name).timestamp() > cutoff
+            ):
+                continue
+            removed += 1
+            self.stdout.write(f"Удаляется {name}")
+            if not dry_run:
+                thumbnails.delete(name)
+        self.stdout.write(self.style.SUCCESS(f"Осиротевших файлов: {removed}"))
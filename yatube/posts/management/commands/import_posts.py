@@ -0,0 +1,71 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from posts.importer import Checkpoint, Importer, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Массово загружает посты или комментарии из NDJSON или CSV "
+        "(например, выгрузки export_data) с продолжением после сбоя."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--kind", choices=("posts", "comments"), default="posts"
+        )
+        parser.add_argument(
+            "--format",
+            dest="fmt",
+            choices=("ndjson", "csv"),
+            help="По умолчанию по расширению файла.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Файл контрольной точки, по умолчанию <path>.checkpoint.",
+        )
+        parser.add_argument(
+            "--create-authors",
+            action="store_true",
+            help="Создавать неизвестных авторов без пароля.",
+        )
+
+    def handle(self, *args, path, kind, fmt, batch_size, **options):
+        fmt = fmt or ("csv" if path.endswith(".csv") else "ndjson")
+        checkpoint = Checkpoint(options["checkpoint"] or f"{path}.checkpoint")
+        importer = Importer(kind, batch_size, options["create_authors"])
+        started = time.perf_counter()
+        if search.restore_index():
+            self.stdout.write(
+                "Триггеры поиска после прерванной загрузки восстановлены, "
+                "индекс перестроен"
+            )
+
+        def report(done, rate):
+            self.stdout.write(f"Обработано {done} записей, {rate:.0f} зап/с")
+
+        try:
+            with open(path, newline="") as file:
+                importer.run(read_records(file, fmt), checkpoint, report)
+        except (OSError, ValueError) as error:
+            raise CommandError(
+                f"Загрузка остановлена: {error}. Повторный запуск "
+                "продолжит с контрольной точки."
+            )
+        importer.finish()
+        checkpoint.clear()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено {importer.imported}, пропущено "
+                f"{importer.skipped} за {elapsed:.1f} с "
+                f"({importer.imported / max(elapsed, 1e-9):.0f} зап/с)"
+            )
+        )
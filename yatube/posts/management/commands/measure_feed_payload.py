@@ -0,0 +1,85 @@
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+
+def parse_srcset(srcset):
+    candidates = []
+    for candidate in srcset.split(","):
+        url, width = candidate.split()
+        candidates.append((int(width.rstrip("w")), url))
+    return sorted(candidates)
+
+
+def pick(candidates, target_width):
+    """Как браузер: наименьший вариант не уже нужной ширины."""
+    for width, url in candidates:
+        if width >= target_width:
+            return url
+    return candidates[-1][1]
+
+
+class FeedImages(HTMLParser):
+    """Собирает для каждой картинки исходный src и выбор по srcset."""
+
+    def __init__(self, target_width):
+        super().__init__()
+        self.target_width = target_width
+        self.source = None
+        self.legacy = []
+        self.responsive = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "source" and self.source is None:
+            self.source = attrs["srcset"]
+        elif tag == "img" and "srcset" in attrs:
+            self.legacy.append(attrs["src"])
+            srcset = self.source or attrs["srcset"]
+            self.responsive.append(
+                pick(parse_srcset(srcset), self.target_width)
+            )
+            self.source = None
+        elif tag == "img" and attrs.get("src", "").startswith(
+            settings.MEDIA_URL
+        ):
+            self.legacy.append(attrs["src"])
+            self.responsive.append(attrs["src"])
+
+
+def media_size(url):
+    start = len(settings.MEDIA_URL)
+    return default_storage.size(url[start:])
+
+
+class Command(BaseCommand):
+    help = (
+        "Измеряет вес страницы ленты: HTML и картинки в прежнем виде "
+        "(одна миниатюра 960px) и с адаптивными вариантами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="/")
+        parser.add_argument(
+            "--viewport", type=int, default=480, help="Ширина экрана, px."
+        )
+        parser.add_argument("--dpr", type=float, default=1.0)
+
+    def handle(self, *args, url, viewport, dpr, **options):
+        response = Client().get(url)
+        html = response.content
+        images = FeedImages(int(viewport * dpr))
+        images.feed(html.decode())
+        legacy = sum(media_size(src) for src in images.legacy)
+        responsive = sum(media_size(src) for src in images.responsive)
+        saved = 1 - responsive / legacy if legacy else 0
+        self.stdout.write(
+            f"{url}: HTML {len(html)} Б, картинок {len(images.legacy)}\n"
+            f"  до (960px JPEG): {len(html) + legacy} Б\n"
+            f"  после (srcset, {viewport}px x{dpr}): "
+            f"{len(html) + responsive} Б\n"
+            f"  экономия на картинках: {saved:.0%}"
+        )
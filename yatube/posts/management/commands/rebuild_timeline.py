@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = "Заполняет материализованные ленты подписок заново."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Перестроить ленту только для указанных пользователей.",
+        )
+
+    def handle(self, *args, usernames=None, **options):
+        users = User.objects.all()
+        if usernames:
+            users = User.objects.filter(username__in=usernames)
+        timeline.rebuild(users)
+        self.stdout.write(self.style.SUCCESS("Ленты подписок перестроены."))
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import seed
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими данными для нагрузочных замеров: "
+        "пользователи, группы, подписки со степенным распределением, "
+        "посты с картинками и комментарии."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="Среднее число подписок у пользователя.",
+        )
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=20,
+            help="Сколько разных картинок создать.",
+        )
+        parser.add_argument(
+            "--image-ratio",
+            type=float,
+            default=0.3,
+            help="Доля постов с картинкой.",
+        )
+        parser.add_argument(
+            "--exponent",
+            type=float,
+            default=1.1,
+            help="Показатель степенного закона популярности.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        seed.generate(
+            users=options["users"],
+            groups=options["groups"],
+            posts=options["posts"],
+            comments=options["comments"],
+            follows=options["follows"],
+            images=options["images"],
+            image_ratio=options["image_ratio"],
+            seed=options["seed"],
+            exponent=options["exponent"],
+        )
+        call_command("refresh_table_stats", stdout=self.stdout)
+        for model in (User, Group, Follow, Post, Comment):
+            self.stdout.write(
+                f"{model._meta.db_table}: {model.objects.count()}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово за {time.perf_counter() - started:.1f} с"
+            )
+        )
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sorl.thumbnail import default
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Создаёт недостающие миниатюры для всех постов с картинками."
+
+    def handle(self, *args, **options):
+        images = (
+            Post.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        built = total = 0
+        for image in images.iterator():
+            for size in settings.POST_THUMBNAILS:
+                for variant in thumbnails.variants(size):
+                    total += 1
+                    geometry = thumbnails.geometry(variant)
+                    ready = thumbnails.backend.get_ready_thumbnail(
+                        image, geometry, **variant.options
+                    )
+                    if ready is None:
+                        thumbnails.backend.get_thumbnail(
+                            image, geometry, **variant.options
+                        )
+                        built += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Миниатюр создано: {built}, уже было готово: {total - built}"
+            )
+        )
+        stats = getattr(default.kvstore, "get_stats", None)
+        if stats is not None:
+            self.stdout.write(f"Статистика KVStore: {stats()}")
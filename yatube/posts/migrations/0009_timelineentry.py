@@ -0,0 +1,104 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_timelines(apps, schema_editor):
+    """Раскладывает посты по лентам существующих подписчиков.
+
+    Авторы сверх TIMELINE_FANOUT_LIMIT подписчиков читаются на лету.
+    """
+    Post = apps.get_model("posts", "Post")
+    Follow = apps.get_model("posts", "Follow")
+    TimelineEntry = apps.get_model("posts", "TimelineEntry")
+    authors = (
+        Follow.objects.values("author_id")
+        .annotate(followers=models.Count("id"))
+        .filter(followers__lte=settings.TIMELINE_FANOUT_LIMIT)
+        .order_by()
+        .values_list("author_id", flat=True)
+    )
+    for author_id in authors.iterator():
+        posts = list(
+            Post.objects.filter(author_id=author_id).values_list(
+                "id", "pub_date"
+            )
+        )
+        follower_ids = Follow.objects.filter(author_id=author_id).values_list(
+            "user_id", flat=True
+        )
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(user_id=user_id, post_id=post_id, pub_date=date)
+                for user_id in follower_ids.iterator()
+                for post_id, date in posts
+            ),
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0008_auto_20230129_2231"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimelineEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "pub_date",
+                    models.DateTimeField(verbose_name="Дата создания поста"),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entries",
+                        to="posts.Post",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Записи ленты",
+                "ordering": ["-pub_date"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="timelineentry",
+            index=models.Index(
+                fields=["user", "-pub_date"],
+                name="posts_timel_user_id_b48120_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="timelineentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "post"), name="unique_timeline_entry"
+            ),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
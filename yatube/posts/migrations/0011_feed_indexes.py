@@ -0,0 +1,70 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:43
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model("posts", "Follow")
+    UserStats = apps.get_model("posts", "UserStats")
+    duplicates = (
+        Follow.objects.values("user_id", "author_id")
+        .annotate(keep_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for row in duplicates.iterator():
+        extra = row["total"] - 1
+        Follow.objects.filter(
+            user_id=row["user_id"], author_id=row["author_id"]
+        ).exclude(id=row["keep_id"]).delete()
+        UserStats.objects.filter(user_id=row["author_id"]).update(
+            followers_count=F("followers_count") - extra
+        )
+        UserStats.objects.filter(user_id=row["user_id"]).update(
+            following_count=F("following_count") - extra
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0010_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-pub_date"], name="comment_post_pub_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_pub_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_pub_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-pub_date", "-id"], name="post_pub_date_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="follow",
+            constraint=models.UniqueConstraint(
+                fields=("user", "author"), name="unique_follow"
+            ),
+        ),
+    ]
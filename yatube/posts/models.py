@@ -3,6 +3,8 @@ from django.db import models
 
 from core.models import CreatedModel
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -31,7 +33,9 @@ class Post(CreatedModel):
     image = models.ImageField(
         "Картинка",
         upload_to="posts/",
+        storage=ContentAddressedStorage(),
         blank=True,
+        db_index=True,
     )
     group = models.ForeignKey(
         Group,
@@ -42,11 +46,27 @@ class Post(CreatedModel):
         verbose_name="Группа",
         help_text="Связанная группа",
     )
+    comments_count = models.PositiveIntegerField(
+        "Число комментариев", default=0, editable=False
+    )
 
     class Meta:
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_pub_date_idx",
+            ),
+            models.Index(
+                fields=["-pub_date", "-id"], name="post_pub_date_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[: Post.STRING_LENGTH]
@@ -69,6 +89,11 @@ class Comment(CreatedModel):
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(
+                fields=["post", "-pub_date"], name="comment_post_pub_date_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text
@@ -85,3 +110,62 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="follower",
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique_follow"
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляемые сигналами."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    posts_count = models.PositiveIntegerField("Число постов", default=0)
+    followers_count = models.PositiveIntegerField(
+        "Число подписчиков", default=0
+    )
+    following_count = models.PositiveIntegerField("Число подписок", default=0)
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: строка на пару подписчик-пост."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    pub_date = models.DateTimeField("Дата создания поста")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        ordering = ["-pub_date"]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-id"],
+                name="timeline_user_pub_date_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry"
+            )
+        ]
@@ -0,0 +1,215 @@
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import counts
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# Поля позиции курсора: дата и id для равных дат.
+KEYS = ("pub_date", "id")
+
+
+def encode_cursor(post, reverse=False, keys=KEYS):
+    """Упаковывает позицию (pub_date, id) в непрозрачный токен.
+
+    post — объект Post или строка из .values() с полями из keys.
+    """
+    direction = "-" if reverse else "+"
+    date_key, id_key = keys
+    if isinstance(post, dict):
+        pub_date, pk = post[date_key], post[id_key]
+    else:
+        pub_date, pk = getattr(post, date_key), getattr(post, id_key)
+    raw = f"{direction}{pub_date.isoformat()}|{pk}"
+    return urlsafe_base64_encode(raw.encode())
+
+
+# Границы INTEGER в SQLite: большее число не передать в запрос.
+MIN_ID, MAX_ID = -(2**63), 2**63 - 1
+
+
+def parse_id(value):
+    pk = int(value)
+    if not MIN_ID <= pk <= MAX_ID:
+        raise InvalidCursor(value)
+    return pk
+
+
+def decode_cursor(cursor):
+    try:
+        raw = urlsafe_base64_decode(cursor).decode()
+        pub_date, pk = raw[1:].split("|")
+        position = (parse_datetime(pub_date), parse_id(pk))
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if raw[0] not in "+-" or position[0] is None:
+        raise InvalidCursor(cursor)
+    return position, raw[0] == "-"
+
+
+class CursorPage(Page):
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(
+                self.object_list[-1], keys=self.paginator.cursor_keys
+            )
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(
+                self.object_list[0],
+                reverse=True,
+                keys=self.paginator.cursor_keys,
+            )
+        return None
+
+
+class CursorPaginator:
+    """Пагинация по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Стоимость любой страницы равна стоимости первой: запрос
+    начинается с позиции из курсора и читает per_page + 1 строк.
+    cursor_keys — поля позиции, если ключ не у самого поста (например,
+    у записи ленты подписок).
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, cursor_keys=KEYS):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.cursor_keys = cursor_keys
+
+    def page_queryset(self, position=None, reverse=False):
+        """Строки после позиции (pub_date, id) в порядке чтения страницы."""
+        date_key, id_key = self.cursor_keys
+        if position is None:
+            return self.object_list.order_by(f"-{date_key}", f"-{id_key}")
+        pub_date, pk = position
+        if reverse:
+            op, ordering = "gt", (date_key, id_key)
+        else:
+            op, ordering = "lt", (f"-{date_key}", f"-{id_key}")
+        # date <= d AND (date < d OR id < pk): первое условие — граница
+        # диапазона индекса (pub_date, id), OR только отсеивает строки.
+        return (
+            self.object_list.order_by(*ordering)
+            .filter(**{f"{date_key}__{op}e": pub_date})
+            .filter(
+                Q(**{f"{date_key}__{op}": pub_date})
+                | Q(**{f"{id_key}__{op}": pk})
+            )
+        )
+
+    def get_page(self, cursor):
+        position, reverse = None, False
+        if cursor:
+            try:
+                position, reverse = decode_cursor(cursor)
+            except InvalidCursor:
+                pass
+        queryset = self.page_queryset(position, reverse)
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+            return CursorPage(rows, self, True, has_more)
+        return CursorPage(rows, self, has_more, position is not None)
+
+
+class WindowedPaginator(Paginator):
+    """Постраничный вывод с окном номеров страниц и подменяемым подсчетом.
+
+    count_strategy — функция из posts.counts, которая по QuerySet
+    возвращает Count(value, exact, capped); по умолчанию точный COUNT(*).
+    Приблизительное число (exact=False) выводится как «~N». Если подсчет
+    упёрся в порог (capped), последние страницы неизвестны, и дальние
+    страницы доступны курсорной пагинацией.
+    """
+
+    ELLIPSIS = "…"
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        *args,
+        count_strategy=None,
+        cursor_keys=KEYS,
+        **kwargs,
+    ):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.count_strategy = count_strategy or counts.exact
+        self.cursor_keys = cursor_keys
+
+    @cached_property
+    def counted(self):
+        return self.count_strategy(self.object_list)
+
+    @cached_property
+    def count(self):
+        return self.counted.value
+
+    @property
+    def count_exact(self):
+        return self.counted.exact
+
+    @property
+    def count_capped(self):
+        return self.counted.capped
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS.
+
+        При ограниченном подсчете последние страницы неизвестны, поэтому
+        окно справа заканчивается пропуском.
+        """
+        number = self.validate_number(number)
+        last = self.num_pages
+        if last <= (on_each_side + on_ends) * 2 and not self.count_capped:
+            yield from self.page_range
+            return
+        if number > on_each_side + on_ends + 2:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if self.count_capped:
+            yield from range(number + 1, min(number + on_each_side, last) + 1)
+            yield self.ELLIPSIS
+        elif number < last - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(last - on_ends + 1, last + 1)
+        else:
+            yield from range(number + 1, last + 1)
+
+
+class EstimatedCountPaginator(WindowedPaginator):
+    """Для админки: подсчет по POSTS_COUNT_STRATEGY вместо COUNT(*)."""
+
+    def __init__(self, object_list, per_page, *args, **kwargs):
+        kwargs.setdefault("count_strategy", counts.get_strategy())
+        super().__init__(object_list, per_page, *args, **kwargs)
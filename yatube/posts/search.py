@@ -0,0 +1,203 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginators import CursorPage, parse_id
+
+TABLE = "posts_post_fts"
+TOKEN_RE = re.compile(r"(\w+)(\*?)")
+MAX_TOKENS = 8
+# Символы из области служебных, которых нет в тексте постов: ими snippet()
+# отмечает совпадения, а после экранирования они заменяются на <mark>.
+MARK_START, MARK_END = "\x02", "\x03"
+
+ORDERINGS = {
+    # bm25 меньше у более релевантных; rowid разводит равные оценки.
+    "rank": ("rank, rowid", "(rank > %s OR (rank = %s AND rowid > %s))"),
+    # FTS5 идет по спискам документов в порядке rowid и останавливается
+    # на LIMIT, поэтому стоимость страницы не зависит от числа совпадений.
+    "new": ("rowid DESC", "rowid < %s"),
+}
+
+
+TRIGGERS = {
+    "posts_post_fts_insert": """
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+    "posts_post_fts_delete": """
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END
+    """,
+    "posts_post_fts_update": """
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+}
+
+
+def rebuild_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def restore_index():
+    """Возвращает триггеры, удаленные прерванной массовой вставкой.
+
+    Если какого-то триггера нет, индекс отстал от таблицы и
+    перестраивается. Возвращает True, когда индекс пришлось чинить.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        if set(TRIGGERS) <= {name for name, in cursor.fetchall()}:
+            return False
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+    rebuild_index()
+    return True
+
+
+@contextmanager
+def deferred_index():
+    """Отключает триггеры индекса на время массовой вставки.
+
+    После блока (и при ошибке тоже) триггеры создаются снова, а индекс
+    перестраивается одним проходом по таблице. Если процесс убит внутри
+    блока, триггеры возвращает restore_index.
+    """
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for sql in TRIGGERS.values():
+                cursor.execute(sql)
+        rebuild_index()
+
+
+def build_query(text):
+    """Переводит строку пользователя в выражение MATCH для FTS5.
+
+    Каждое слово берется в кавычки, чтобы операторы FTS5 во вводе
+    не ломали запрос. Слово со звездочкой и последнее слово ищутся
+    по префиксу. Пустая строка означает, что искать нечего.
+    """
+    tokens = TOKEN_RE.findall(text)[:MAX_TOKENS]
+    terms = []
+    for index, (word, star) in enumerate(tokens):
+        prefix = star or index == len(tokens) - 1
+        terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def matching(expression):
+    """Условие для QuerySet: id постов, найденных полнотекстовым индексом."""
+    return RawSQL(
+        f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s", (expression,)
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, "<mark>")
+        .replace(MARK_END, "</mark>")
+    )
+
+
+def encode_cursor(rank, pk):
+    return urlsafe_base64_encode(f"{rank!r}|{pk}".encode())
+
+
+def decode_cursor(cursor):
+    try:
+        rank, pk = urlsafe_base64_decode(cursor).decode().split("|")
+        return float(rank), parse_id(pk)
+    except ValueError:
+        return None
+
+
+class SearchPage(CursorPage):
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            last = self.object_list[-1]
+            return encode_cursor(last.search_rank, last.pk)
+        return None
+
+    @property
+    def previous_cursor(self):
+        return None
+
+
+class SearchPaginator:
+    """Постраничный вывод результатов поиска по ключу (rank, rowid).
+
+    Запрос к FTS5 отдает только rowid, оценку и фрагмент текста, сами
+    посты читаются одним запросом по первичному ключу. Между страницами
+    оценки могут немного сдвинуться из-за новых постов — для поиска это
+    допустимо, повторов и пропусков внутри одной выдачи это не дает.
+    """
+
+    is_cursor = True
+
+    def __init__(self, expression, per_page, order="rank"):
+        self.expression = expression
+        self.per_page = int(per_page)
+        self.order = order if order in ORDERINGS else "rank"
+
+    def _rows(self, position):
+        ordering, keyset = ORDERINGS[self.order]
+        params = [MARK_START, MARK_END, self.expression]
+        where = f"{TABLE} MATCH %s"
+        if position is not None:
+            rank, pk = position
+            where += f" AND {keyset}"
+            params += [rank, rank, pk] if self.order == "rank" else [pk]
+        sql = (
+            f"SELECT rowid, rank, snippet({TABLE}, 0, %s, %s, '…', 16) "
+            f"FROM {TABLE} WHERE {where} ORDER BY {ordering} LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [self.per_page + 1])
+            return cursor.fetchall()
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor) if cursor else None
+        rows = self._rows(position) if self.expression else []
+        has_next = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        posts = Post.objects.select_related("author", "group").in_bulk(
+            [pk for pk, _, _ in rows]
+        )
+        object_list = []
+        for pk, rank, snippet in rows:
+            post = posts.get(pk)
+            if post is None:
+                continue
+            post.search_rank = rank
+            post.search_snippet = highlight(snippet)
+            object_list.append(post)
+        return SearchPage(object_list, self, has_next, position is not None)
+
+
+def search(text, per_page, cursor=None, order="rank"):
+    paginator = SearchPaginator(build_query(text), per_page, order)
+    return paginator.get_page(cursor)
@@ -0,0 +1,189 @@
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from faker import Faker
+from PIL import Image
+
+from . import cache, counters, search, timeline
+from .importer import keep_pub_date
+from .models import Comment, Follow, Group, Post, User
+
+STAFF_USERNAME = "benchmark"
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса 1/k^exponent: немногие элементы получают почти всё."""
+    return list(accumulate(1 / (k**exponent) for k in range(1, size + 1)))
+
+
+class Generator:
+    """Детерминированный по seed набор данных для нагрузочных замеров.
+
+    Популярность авторов, групп и постов распределена по степенному
+    закону, как в живых соцсетях: у нескольких авторов тысячи подписчиков,
+    у большинства — единицы. Всё пишется bulk_create без сигналов,
+    производные данные пересчитываются в finish().
+    """
+
+    def __init__(self, seed=0, exponent=1.1, days=365):
+        self.random = random.Random(seed)
+        self.fake = Faker("ru_RU")
+        self.fake.seed_instance(seed)
+        self.exponent = exponent
+        self.now = timezone.now()
+        self.days = days
+        self.batch_size = settings.IMPORT_BATCH_SIZE
+
+    def _pick(self, items, weights, count=1):
+        return self.random.choices(items, cum_weights=weights, k=count)
+
+    def _ranked(self, items):
+        """Копия items в случайном порядке: место в ней — ранг популярности."""
+        items = list(items)
+        self.random.shuffle(items)
+        return items, zipf_weights(len(items), self.exponent)
+
+    def _date(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(self.days * 24 * 3600)
+        )
+
+    def users(self, count):
+        start = User.objects.count()
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"{self.fake.user_name()}{start + i}",
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    password=make_password(None),
+                )
+                for i in range(count)
+            )
+        )
+        User.objects.get_or_create(
+            username=STAFF_USERNAME,
+            defaults={"is_staff": True, "password": make_password(None)},
+        )
+
+    def groups(self, count):
+        start = Group.objects.count()
+        Group.objects.bulk_create(
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f"group-{start + i}",
+                description=self.fake.paragraph(),
+            )
+            for i in range(count)
+        )
+
+    def follows(self, per_user):
+        """Число подписок у читателя и выбор авторов — тоже степенные."""
+        user_ids = list(User.objects.values_list("id", flat=True))
+        authors, weights = self._ranked(user_ids)
+        follows = []
+        for user_id in user_ids:
+            count = round(self.random.paretovariate(2) * per_user / 2)
+            chosen = set(self._pick(authors, weights, count)) - {user_id}
+            follows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in chosen
+            )
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+    def images(self, count):
+        """Сохраняет count разных JPEG и возвращает их имена в хранилище."""
+        storage = Post._meta.get_field("image").storage
+        names = []
+        for _ in range(count):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new("RGB", (960, 640), color).save(buffer, "JPEG")
+            names.append(
+                storage.save("posts/seed.jpg", ContentFile(buffer.getvalue()))
+            )
+        return names
+
+    def _post(self, authors, weights, groups, images, image_ratio):
+        group_ids, group_weights = groups
+        group_id = None
+        if group_ids and self.random.random() < 0.7:
+            group_id = self._pick(group_ids, group_weights)[0]
+        image = ""
+        if images and self.random.random() < image_ratio:
+            image = self.random.choice(images)
+        return Post(
+            author_id=self._pick(authors, weights)[0],
+            group_id=group_id,
+            text=self.fake.paragraph(nb_sentences=self.random.randint(1, 8)),
+            image=image,
+            pub_date=self._date(),
+        )
+
+    def posts(self, count, images=(), image_ratio=0.3):
+        authors, weights = self._ranked(
+            User.objects.values_list("id", flat=True)
+        )
+        groups = self._ranked(Group.objects.values_list("id", flat=True))
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            Post.objects.bulk_create(
+                self._post(authors, weights, groups, images, image_ratio)
+                for _ in range(size)
+            )
+
+    def comments(self, count):
+        posts, weights = self._ranked(
+            Post.objects.values_list("id", "pub_date")
+        )
+        user_ids = list(User.objects.values_list("id", flat=True))
+        if not posts or not user_ids:
+            return
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for _ in range(min(self.batch_size, count - start)):
+                post_id, posted = self._pick(posts, weights)[0]
+                delay = (self.now - posted) * self.random.random()
+                batch.append(
+                    Comment(
+                        post_id=post_id,
+                        author_id=self.random.choice(user_ids),
+                        text=self.fake.sentence(),
+                        pub_date=posted + delay,
+                    )
+                )
+            Comment.objects.bulk_create(batch)
+
+    def finish(self):
+        counters.reconcile()
+        timeline.rebuild(User.objects.all())
+        cache.bump(cache.GLOBAL_SCOPE)
+
+
+def generate(
+    users,
+    groups,
+    posts,
+    comments,
+    follows=20,
+    images=0,
+    image_ratio=0.3,
+    seed=0,
+    exponent=1.1,
+):
+    generator = Generator(seed, exponent)
+    generator.users(users)
+    generator.groups(groups)
+    generator.follows(follows)
+    image_names = generator.images(images)
+    with search.deferred_index(), keep_pub_date(Post, Comment):
+        generator.posts(posts, image_names, image_ratio)
+        generator.comments(comments)
+    generator.finish()
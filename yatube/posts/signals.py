@@ -0,0 +1,146 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+NAME_FIELDS = ("username", "first_name", "last_name")
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        previous = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group_id", "image")
+            .first()
+        )
+        if previous is not None:
+            instance._previous_group_id, instance._previous_image = previous
+
+
+def delete_unused_image(name):
+    # До коммита тот же файл мог загрузить другой пост.
+    if not Post.objects.filter(image=name).exists():
+        thumbnails.delete(name)
+
+
+def release_image(name):
+    """Удаляет файл и его миниатюры, если на него не ссылается ни один пост."""
+    if name and not Post.objects.filter(image=name).exists():
+        transaction.on_commit(lambda: delete_unused_image(name))
+
+
+@receiver(post_save, sender=Post)
+def build_thumbnails(sender, instance, raw=False, **kwargs):
+    image = instance.image.name
+    previous = getattr(instance, "_previous_image", "")
+    if raw or image == previous:
+        return
+    if image:
+        thumbnails.schedule(image)
+    release_image(previous)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, posts_count=1)
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous = getattr(instance, "_previous_group_id", None)
+        cache.bump(
+            *cache.post_scopes(instance, [previous]), f"post:{instance.id}"
+        )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.bump(*cache.post_scopes(instance.post))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_all_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.bump(cache.GLOBAL_SCOPE, f"group_card:{instance.id}")
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    """Строка счётчиков создаётся вместе с пользователем, чтобы первый
+    пост или подписка не платили за нее в своем запросе.
+    """
+    if created and not raw:
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=instance.pk)], ignore_conflicts=True
+        )
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_name(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    instance._previous_name = None
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(NAME_FIELDS):
+        return
+    instance._previous_name = (
+        User.objects.filter(pk=instance.pk).values_list(*NAME_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, raw=False, **kwargs):
+    """Имя автора выводится в карточках всех его постов во всех лентах."""
+    previous = getattr(instance, "_previous_name", None)
+    current = tuple(getattr(instance, field) for field in NAME_FIELDS)
+    if not raw and previous is not None and previous != current:
+        cache.bump(cache.GLOBAL_SCOPE, f"user:{instance.id}")
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, followers_count=1)
+        counters.change_user(instance.user_id, following_count=1)
+        timeline.add_follow(instance)
+        cache.bump(f"profile:{instance.author.username}")
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, followers_count=-1)
+    counters.change_user(instance.user_id, following_count=-1)
+    timeline.remove_follow(instance)
+    cache.bump(f"profile:{instance.author.username}")
@@ -0,0 +1,31 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл по хешу содержимого: posts/ab/<sha256>.jpg.
+
+    Одинаковые загрузки получают одно имя и один файл, поэтому
+    и миниатюры у них общие.
+    """
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, hexdigest[:2], hexdigest + extension)
+        # Файл пишется всегда, даже если он есть: его может удалять
+        # отложенная очистка поста, который ссылался на ту же картинку.
+        # Запись через временное имя и os.replace не оставляет читателям
+        # недописанный файл.
+        temporary = super()._save(name + ".upload", content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
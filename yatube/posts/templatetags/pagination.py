@@ -0,0 +1,29 @@
+from django import template
+
+from posts.paginators import encode_cursor
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page_obj, on_each_side=2, on_ends=1):
+    """Номера страниц для ссылок: окно вокруг текущей и края."""
+    paginator = page_obj.paginator
+    if not hasattr(paginator, "get_elided_page_range"):
+        return paginator.page_range
+    return list(
+        paginator.get_elided_page_range(
+            page_obj.number, on_each_side=on_each_side, on_ends=on_ends
+        )
+    )
+
+
+@register.simple_tag
+def continue_cursor(page_obj):
+    """Курсор для перехода дальше последней посчитанной страницы."""
+    if page_obj.object_list:
+        return encode_cursor(
+            list(page_obj.object_list)[-1],
+            keys=page_obj.paginator.cursor_keys,
+        )
+    return ""
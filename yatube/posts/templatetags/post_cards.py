@@ -0,0 +1,11 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Карточка поста для лент, из кеша фрагментов."""
+    return cards.render(post, getattr(context, "request", None))
@@ -0,0 +1,37 @@
+from django import template
+from django.conf import settings
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+def srcset(variants):
+    return ", ".join(f"{thumb.url} {width}w" for width, thumb in variants)
+
+
+@register.inclusion_tag("posts/includes/post_image.html")
+def post_image(post, size="card"):
+    """Адаптивная картинка поста (srcset, WebP) без ресайза в запросе."""
+    context = {"post": post, "ready": None}
+    if not post.image:
+        return context
+    ready = thumbnails.get_ready(post.image, size)
+    if ready is None:
+        return context
+    fallback_format = settings.POST_THUMBNAIL_FORMATS[-1]
+    fallback = ready.pop(fallback_format)
+    width, largest = fallback[-1]
+    context.update(
+        ready=True,
+        sources=[
+            {"type": thumbnails.MIME_TYPES[name], "srcset": srcset(variants)}
+            for name, variants in ready.items()
+        ],
+        src=largest.url,
+        srcset=srcset(fallback),
+        sizes=settings.POST_THUMBNAILS[size].get("sizes", f"{width}px"),
+        width=largest.width,
+        height=largest.height,
+    )
+    return context
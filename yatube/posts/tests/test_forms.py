@@ -1,21 +1,41 @@
+import hashlib
+import os
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts import cache as feed_cache
+from posts import thumbnails
 from posts.models import Comment, Group, Post
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xff\xff\xff\x21\xf9\x04\x00\x00"
+    b"\x00\x00\x00\x2c\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0c"
+    b"\x0a\x00\x3b"
+)
+SMALL_GIF_HASH = hashlib.sha256(SMALL_GIF).hexdigest()
+SMALL_GIF_NAME = f"posts/{SMALL_GIF_HASH[:2]}/{SMALL_GIF_HASH}.gif"
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT, "kv.sqlite3"),
+)
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -90,17 +110,8 @@ class PostFormTests(TestCase):
     def test_image_in_new_post(self):
         """Создается запись в базе данных с картинкой"""
         posts_count = Post.objects.count()
-
-        small_gif = (
-            b"\x47\x49\x46\x38\x39\x61\x02\x00"
-            b"\x01\x00\x80\x00\x00\x00\x00\x00"
-            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
-            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
-            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
-            b"\x0A\x00\x3B"
-        )
         uploaded = SimpleUploadedFile(
-            name="small.gif", content=small_gif, content_type="image/gif"
+            name="small.gif", content=SMALL_GIF, content_type="image/gif"
         )
         form_data = {
             "text": self.post.text,
@@ -120,10 +131,147 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 text="Тестовый пост",
                 group=self.group.id,
-                image="posts/small.gif",
+                image=SMALL_GIF_NAME,
             ).exists()
         )
 
+    def upload_post(self, name, text="С картинкой"):
+        uploaded = SimpleUploadedFile(
+            name=name, content=SMALL_GIF, content_type="image/gif"
+        )
+        self.authorized_client.post(
+            reverse("posts:post_create"),
+            data={"text": text, "image": uploaded},
+        )
+        return Post.objects.get(text=text)
+
+    @override_settings(THUMBNAIL_ASYNC=False)
+    def test_thumbnails_built_on_save(self):
+        """Миниатюры создаются при сохранении поста из формы."""
+        post = self.upload_post("thumb.gif")
+        ready = thumbnails.get_ready(post.image, "card")
+        self.assertIsNotNone(ready)
+        widths = [width for width, _ in ready["JPEG"]]
+        self.assertEqual(widths, [480, 720, 960])
+        for _, thumbnail in ready["JPEG"]:
+            self.assertTrue(
+                thumbnail.name.startswith(f"{SMALL_GIF_NAME[:-4]}_")
+            )
+        response = self.authorized_client.get(
+            reverse("posts:post_detail", args=(post.id,))
+        )
+        self.assertContains(response, f'{ready["JPEG"][0][1].url} 480w')
+        self.assertContains(response, 'loading="lazy"')
+
+    @override_settings(THUMBNAIL_ASYNC=False)
+    def test_all_thumbnails_recorded(self):
+        """KVStore помнит все варианты картинки: по ним их удаляет gc."""
+        post = self.upload_post("recorded.gif")
+        self.addCleanup(thumbnails.delete, post.image.name)
+        names = thumbnails.thumbnail_names(post.image.name)
+        expected = [
+            variant
+            for size in settings.POST_THUMBNAILS
+            for variant in thumbnails.variants(size)
+        ]
+        self.assertEqual(len(names), len(expected))
+        for variant in expected:
+            marker = f"_{thumbnails.geometry(variant)}_"
+            with self.subTest(marker=marker):
+                self.assertTrue(any(marker in name for name in names))
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """Пока миниатюра не готова, выводится заглушка без ресайза."""
+        post = self.upload_post("pending.gif")
+        with mock.patch.object(
+            thumbnails.backend, "get_thumbnail"
+        ) as get_thumbnail:
+            response = self.authorized_client.get(
+                reverse("posts:post_detail", args=(post.id,))
+            )
+        get_thumbnail.assert_not_called()
+        self.assertContains(response, "bg-light")
+
+    def test_failed_thumbnails_not_retried(self):
+        """Битая картинка не сбрасывает ленты и не ставится в очередь
+        на каждом показе.
+        """
+        post = Post.objects.create(
+            author=self.user, text="Без файла", image="posts/missing.gif"
+        )
+        with mock.patch.object(feed_cache, "bump") as bump, self.assertLogs(
+            "sorl.thumbnail", "ERROR"
+        ):
+            thumbnails._run(post.image.name)
+        bump.assert_not_called()
+        with mock.patch.object(thumbnails, "schedule") as schedule:
+            self.assertIsNone(thumbnails.get_ready(post.image, "card"))
+        schedule.assert_not_called()
+
+    def test_ready_thumbnails_refresh_only_own_pages(self):
+        post = self.upload_post("own.gif")
+        self.addCleanup(thumbnails.delete, post.image.name)
+        with mock.patch.object(feed_cache, "bump") as bump:
+            thumbnails._run(post.image.name)
+        [scopes] = [call.args for call in bump.call_args_list]
+        self.assertNotIn(feed_cache.GLOBAL_SCOPE, scopes)
+        self.assertIn(f"image:{post.image.name}", scopes)
+        self.assertIn(f"post:{post.id}", scopes)
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые картинки хранятся одним файлом, пока он кому-то нужен."""
+        first = self.upload_post("first.gif", text="Первый")
+        second = self.upload_post("second.gif", text="Второй")
+        self.assertEqual(first.image.name, SMALL_GIF_NAME)
+        self.assertEqual(second.image.name, SMALL_GIF_NAME)
+        directory = os.path.join(
+            TEMP_MEDIA_ROOT, os.path.dirname(SMALL_GIF_NAME)
+        )
+        self.assertEqual(
+            os.listdir(directory), [os.path.basename(SMALL_GIF_NAME)]
+        )
+        with mock.patch(
+            "posts.signals.transaction.on_commit", lambda func: func()
+        ), mock.patch.object(thumbnails.backend, "delete") as delete:
+            first.delete()
+            delete.assert_not_called()
+            second.delete()
+        delete.assert_called_once_with(SMALL_GIF_NAME)
+
+    def test_released_image_reuploaded_before_commit(self):
+        """Отложенная очистка не удаляет файл, загруженный заново."""
+        first = self.upload_post("first.gif", text="Первый")
+        with mock.patch("posts.signals.transaction.on_commit") as on_commit:
+            first.delete()
+        [[deferred], _] = on_commit.call_args
+        second = self.upload_post("second.gif", text="Второй")
+        with mock.patch.object(thumbnails.backend, "delete") as delete:
+            deferred()
+        delete.assert_not_called()
+        self.assertEqual(second.image.name, SMALL_GIF_NAME)
+
+    def test_existing_file_rewritten_on_upload(self):
+        """Повторная загрузка перезаписывает файл, а не верит его наличию."""
+        self.upload_post("first.gif", text="Первый")
+        path = os.path.join(TEMP_MEDIA_ROOT, SMALL_GIF_NAME)
+        with open(path, "wb") as file:
+            file.write(b"")
+        self.upload_post("second.gif", text="Второй")
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), SMALL_GIF)
+
+    def test_gc_images_keeps_referenced_files(self):
+        """gc_images удаляет только файлы, на которые нет ссылок."""
+        post = self.upload_post("kept.gif")
+        orphan = os.path.join(TEMP_MEDIA_ROOT, "posts", "orphan.gif")
+        with open(orphan, "wb") as file:
+            file.write(SMALL_GIF)
+        out = StringIO()
+        call_command("gc_images", "--min-age", "0", stdout=out)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertIn("Осиротевших файлов: 1", out.getvalue())
+
     def test_create_comment(self):
         """Cоздание записи в Comment."""
         comment_count = Comment.objects.count()
@@ -1,10 +1,67 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.utils import timezone
 
-from ..models import Group, Post
+from .. import search
+from ..models import (
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TimelineEntry,
+    UserStats,
+)
+from ..paginators import CursorPaginator
 
 User = get_user_model()
 
+# sqlite_stat1 после ANALYZE базы на 400 тысяч постов: на маленьких
+# тестовых таблицах SQLite выбирает другие планы.
+LARGE_TABLE_STATS = [
+    ("auth_user", "sqlite_autoindex_auth_user_1", "500 1"),
+    ("posts_post", "post_pub_date_idx", "400000 1 1"),
+    ("posts_post", "post_group_pub_date_idx", "400000 20000 1 1"),
+    ("posts_post", "post_author_pub_date_idx", "400000 800 1 1"),
+    ("posts_post", "posts_post_group_id_c91a8485", "400000 20000"),
+    ("posts_post", "posts_post_author_id_fe5487bf", "400000 800"),
+    ("posts_timelineentry", "timeline_user_pub_date_idx", "40000 800 1 1"),
+    (
+        "posts_timelineentry",
+        "posts_timelineentry_user_id_8e5f8e4b",
+        "40000 800",
+    ),
+    ("posts_timelineentry", "posts_timelineentry_post_id_fa7b1b6d", "40000 1"),
+    (
+        "posts_timelineentry",
+        "sqlite_autoindex_posts_timelineentry_1",
+        "40000 800 1",
+    ),
+]
+
+
+def use_large_table_stats():
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+        cursor.execute("DELETE FROM sqlite_stat1")
+        cursor.executemany(
+            "INSERT INTO sqlite_stat1 VALUES (%s, %s, %s)", LARGE_TABLE_STATS
+        )
+        cursor.execute("ANALYZE sqlite_master")
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return " | ".join(row[-1] for row in cursor.fetchall())
+
 
 class PostModelTest(TestCase):
     @classmethod
@@ -56,3 +113,218 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected
                 )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+
+    def test_counters_follow_writes(self):
+        """Счётчики обновляются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text="Пост")
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="Комментарий"
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_reconcile_counters_repairs_drift(self):
+        Post.objects.bulk_create(
+            [Post(author=self.author, text=f"Пост {i}") for i in range(3)]
+        )
+        call_command("reconcile_counters", stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 3
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).posts_count, 0
+        )
+
+    def test_delete_user_with_posts_and_followers(self):
+        """Каскад удаляет строку счётчиков раньше постов и подписок."""
+        user = User.objects.create_user(username="leaving")
+        Post.objects.create(author=user, text="Пост")
+        Follow.objects.create(user=self.reader, author=user)
+        Follow.objects.create(user=user, author=self.author)
+        user.delete()
+        self.assertFalse(UserStats.objects.filter(user_id=user.id).exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 0
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0
+        )
+
+    def test_drifted_counter_stays_at_zero(self):
+        post = Post.objects.create(author=self.author, text="Пост")
+        UserStats.objects.filter(user=self.author).update(posts_count=0)
+        post.delete()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 0
+        )
+
+
+class SchemaTest(TestCase):
+    def test_follow_is_unique(self):
+        """Повторная подписка на автора запрещена на уровне БД."""
+        user = User.objects.create_user(username="user")
+        author = User.objects.create_user(username="author")
+        Follow.objects.create(user=user, author=author)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=user, author=author)
+
+    def test_cursor_seeks_index_on_large_table(self):
+        """Позиция курсора — граница диапазона индекса, без сортировки."""
+        use_large_table_stats()
+        paginator = CursorPaginator(
+            Post.objects.select_related("author", "group"), 10
+        )
+        for reverse in (False, True):
+            with self.subTest(reverse=reverse):
+                plan = query_plan(
+                    paginator.page_queryset((timezone.now(), 1), reverse)[:11]
+                )
+                self.assertIn("post_pub_date_idx (pub_date", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_feed_queries_use_indexes(self):
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+        self.assertNotIn("FAIL", out.getvalue())
+
+    def test_feed_queries_use_indexes_on_large_tables(self):
+        use_large_table_stats()
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+        self.assertNotIn("FAIL", out.getvalue())
+
+
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def write_ndjson(self, records):
+        return self.write(
+            "posts.ndjson", "".join(json.dumps(r) + "\n" for r in records)
+        )
+
+    def import_posts(self, path, *args):
+        out = StringIO()
+        call_command("import_posts", path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_keeps_dates_and_rebuilds_derived_data(self):
+        path = self.write_ndjson(
+            [
+                {
+                    "author": "author",
+                    "group": "group",
+                    "text": "Старый пост про маяк",
+                    "pub_date": "2015-03-01T10:00:00+00:00",
+                },
+                {"author": "author", "text": "Второй пост"},
+            ]
+        )
+        output = self.import_posts(path, "--batch-size", "1")
+        post = Post.objects.get(text="Старый пост про маяк")
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(search.search("маяк", 10).object_list, [post])
+        self.assertIn("Загружено 2, пропущено 0", output)
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+    def test_search_triggers_restored_after_killed_import(self):
+        with connection.cursor() as cursor:
+            for name in search.TRIGGERS:
+                cursor.execute(f"DROP TRIGGER {name}")
+        Post.objects.create(author=self.author, text="Пост про маяк")
+        with self.assertRaises(CommandError):
+            self.import_posts(os.path.join(self.directory, "missing.csv"))
+        self.assertEqual(len(search.search("маяк", 10)), 1)
+        post = Post.objects.create(author=self.author, text="Пост про ежа")
+        self.assertEqual(search.search("ежа", 10).object_list, [post])
+
+    def test_unknown_authors_and_groups(self):
+        path = self.write(
+            "posts.csv",
+            "author,group,text\n"
+            "newcomer,,Пост нового автора\n"
+            "author,missing,Пост в неизвестной группе\n",
+        )
+        output = self.import_posts(path)
+        self.assertIn("Загружено 0, пропущено 2", output)
+        self.import_posts(path, "--create-authors")
+        self.assertTrue(
+            Post.objects.filter(
+                author__username="newcomer", text="Пост нового автора"
+            ).exists()
+        )
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_resume_from_checkpoint(self):
+        path = self.write_ndjson(
+            [{"author": "author", "text": f"Пост {i}"} for i in range(5)]
+        )
+        self.write("posts.ndjson.checkpoint", "3")
+        self.import_posts(path)
+        self.assertQuerysetEqual(
+            Post.objects.order_by("id").values_list("text", flat=True),
+            ["Пост 3", "Пост 4"],
+            transform=str,
+        )
+
+    def test_batch_larger_than_sqlite_insert_limit(self):
+        path = self.write_ndjson(
+            [{"author": "author", "text": f"Пост {i}"} for i in range(600)]
+        )
+        self.import_posts(path, "--batch-size", "600")
+        self.assertEqual(Post.objects.count(), 600)
+
+    def test_import_comments_updates_counters(self):
+        post = Post.objects.create(author=self.author, text="Пост")
+        path = self.write_ndjson(
+            [
+                {"post_id": post.id, "author": "reader", "text": "Первый"},
+                {"post_id": post.id, "author": "reader", "text": "Второй"},
+            ]
+        )
+        self.import_posts(path, "--kind", "comments")
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
@@ -1,15 +1,35 @@
+import csv
+import gzip
+import json
+import os
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import urlsafe_base64_encode
 
-from posts.models import Comment, Group, Post
+from posts import cache as feed_cache
+from posts import counters
+from posts import urls as posts_urls
+from posts.counts import Count
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.paginators import (
+    EstimatedCountPaginator,
+    WindowedPaginator,
+    encode_cursor,
+)
 
 User = get_user_model()
 
@@ -48,16 +68,51 @@ class PostPagesTests(TestCase):
     def test_index_cache(self):
         """Проверка работы кеша для index"""
         response_1 = self.authorized_client.get(reverse("posts:index"))
-        Post.objects.create(
-            author=self.user,
-            text="Для кеша",
-            group=self.group,
-        )
         response_2 = self.authorized_client.get(reverse("posts:index"))
+        self.assertIsNone(response_2.context)
         self.assertEqual(response_1.content, response_2.content)
         cache.clear()
         response_3 = self.authorized_client.get(reverse("posts:index"))
-        self.assertNotEqual(response_1.content, response_3.content)
+        self.assertIsNotNone(response_3.context)
+
+    def test_cache_invalidated_on_post_create(self):
+        """Новый пост сразу виден, несвязанные страницы остаются в кеше."""
+        Group.objects.create(
+            title="Другая группа", slug="other-slug", description="Описание"
+        )
+        other_url = reverse("posts:group_list", kwargs={"slug": "other-slug"})
+        pages = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": self.user.username}),
+        ]
+        for url in pages + [other_url]:
+            self.authorized_client.get(url)
+        self.authorized_client.post(
+            reverse("posts:post_create"),
+            data={"text": "Свежий пост", "group": self.group.id},
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "Свежий пост")
+        response = self.authorized_client.get(other_url)
+        self.assertIsNone(response.context)
+
+    def test_cache_invalidated_on_group_change(self):
+        """Перенос поста в другую группу сбрасывает обе страницы групп."""
+        other_group = Group.objects.create(
+            title="Другая группа", slug="other-slug", description="Описание"
+        )
+        old_url = reverse("posts:group_list", kwargs={"slug": self.group.slug})
+        new_url = reverse("posts:group_list", kwargs={"slug": "other-slug"})
+        self.authorized_client.get(old_url)
+        self.authorized_client.get(new_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other_group
+        post.save()
+        self.assertNotContains(self.authorized_client.get(old_url), "Тестовый")
+        self.assertContains(self.authorized_client.get(new_url), "Тестовый")
 
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
@@ -199,10 +254,10 @@ class PostPagesTests(TestCase):
         small_gif = (
             b"\x47\x49\x46\x38\x39\x61\x02\x00"
             b"\x01\x00\x80\x00\x00\x00\x00\x00"
-            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
-            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
-            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
-            b"\x0A\x00\x3B"
+            b"\xff\xff\xff\x21\xf9\x04\x00\x00"
+            b"\x00\x00\x00\x2c\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0c"
+            b"\x0a\x00\x3b"
         )
         uploaded = SimpleUploadedFile(
             name="small.gif", content=small_gif, content_type="image/gif"
@@ -235,10 +290,10 @@ class PostPagesTests(TestCase):
         small_gif = (
             b"\x47\x49\x46\x38\x39\x61\x02\x00"
             b"\x01\x00\x80\x00\x00\x00\x00\x00"
-            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
-            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
-            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
-            b"\x0A\x00\x3B"
+            b"\xff\xff\xff\x21\xf9\x04\x00\x00"
+            b"\x00\x00\x00\x2c\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0c"
+            b"\x0a\x00\x3b"
         )
         uploaded = SimpleUploadedFile(
             name="small.gif", content=small_gif, content_type="image/gif"
@@ -271,6 +326,44 @@ class PostPagesTests(TestCase):
         self.assertEqual(post_comment, self.comment.text)
 
 
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_ASYNC=False,
+    THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT, "kv.sqlite3"),
+)
+class ThumbnailReadPathTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_feed_page_does_not_probe_storage(self):
+        """Страница из 10 постов с картинками не обращается к хранилищу."""
+        user = User.objects.create_user(username="photographer")
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xff\xff\xff\x21\xf9\x04\x00\x00"
+            b"\x00\x00\x00\x2c\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0c"
+            b"\x0a\x00\x3b"
+        )
+        for i in range(10):
+            Post.objects.create(
+                author=user,
+                text=f"Пост {i}",
+                image=SimpleUploadedFile(f"photo{i}.gif", small_gif),
+            )
+        cache.clear()
+        with mock.patch.object(
+            FileSystemStorage, "exists"
+        ) as exists, mock.patch.object(FileSystemStorage, "open") as opened:
+            response = self.client.get(reverse("posts:index"))
+        exists.assert_not_called()
+        opened.assert_not_called()
+        self.assertContains(response, '<img class="card-img', count=10)
+
+
 class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -293,6 +386,8 @@ class PaginatorViewsTest(TestCase):
                 )
             )
         Post.objects.bulk_create(cls.post)
+        # bulk_create не шлет сигналов, счетчики — как после импорта.
+        counters.reconcile()
 
         cls.pages = {
             "posts:index": {},
@@ -319,6 +414,181 @@ class PaginatorViewsTest(TestCase):
                 )
                 self.assertEqual(len(response.context["page_obj"]), 3)
 
+    @override_settings(POSTS_PAGINATION="cursor")
+    def test_cursor_pages_cover_all_records(self):
+        """Курсорная пагинация проходит ленту без пропусков и повторов."""
+        for page, args in self.pages.items():
+            with self.subTest(page=page):
+                url = reverse(page, kwargs=args)
+                first = self.author_client.get(url).context["page_obj"]
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+                second = self.author_client.get(
+                    f"{url}?cursor={first.next_cursor}"
+                ).context["page_obj"]
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                ids = {post.id for post in first}
+                ids.update(post.id for post in second)
+                self.assertEqual(len(ids), 13)
+                back = self.author_client.get(
+                    f"{url}?cursor={second.previous_cursor}"
+                ).context["page_obj"]
+                self.assertEqual(list(back), list(first))
+
+    @override_settings(POSTS_PAGINATION="cursor")
+    def test_offset_links_still_work_in_cursor_mode(self):
+        """Старые ссылки ?page=N продолжают работать."""
+        for page, args in self.pages.items():
+            with self.subTest(page=page):
+                response = self.author_client.get(
+                    reverse(page, kwargs=args) + "?page=2"
+                )
+                self.assertEqual(len(response.context["page_obj"]), 3)
+
+    @override_settings(POSTS_PAGINATION="cursor")
+    def test_follow_cursor_uses_timeline_keyset(self):
+        """Курсор ленты подписок идет по (pub_date, id) записи ленты."""
+        reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=reader, author=self.user)
+        self.author_client.force_login(reader)
+        url = reverse("posts:follow_index")
+        with CaptureQueriesContext(connection) as queries:
+            first = self.author_client.get(url).context["page_obj"]
+        self.assertTrue(
+            any(
+                'ORDER BY "feed_date" DESC' in query["sql"]
+                and '"posts_timelineentry"."pub_date" AS "feed_date"'
+                in query["sql"]
+                for query in queries
+            )
+        )
+        second = self.author_client.get(
+            f"{url}?cursor={first.next_cursor}"
+        ).context["page_obj"]
+        ids = {post.id for post in first}
+        ids.update(post.id for post in second)
+        self.assertEqual(len(ids), 13)
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.author_client.get(
+            reverse("posts:index") + "?cursor=garbage"
+        )
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+    def test_profile_count_from_counters(self):
+        """Число постов профиля берется из UserStats, без COUNT(*)."""
+        url = reverse("posts:profile", kwargs={"username": self.user.username})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author_client.get(url + "?page=2")
+        self.assertEqual(len(response.context["page_obj"]), 3)
+        for query in queries:
+            self.assertNotIn("COUNT(", query["sql"])
+
+    def test_cursor_with_huge_id_returns_first_page(self):
+        cursor = urlsafe_base64_encode(
+            b"+2020-01-01T00:00:00+00:00|" + b"9" * 30
+        )
+        response = self.author_client.get(
+            reverse("posts:index") + f"?cursor={cursor}"
+        )
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+    def test_page_window(self):
+        """Ссылки только на окно страниц вокруг текущей и края."""
+        paginator = WindowedPaginator(list(range(200)), 10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(7)),
+            [1, "…", 5, 6, 7, 8, 9, "…", 20],
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)), [1, 2, 3, "…", 20]
+        )
+        capped = WindowedPaginator(
+            list(range(200)),
+            10,
+            count_strategy=lambda objects: Count(50, exact=False, capped=True),
+        )
+        self.assertEqual(capped.num_pages, 5)
+        self.assertTrue(capped.count_capped)
+        self.assertEqual(
+            list(capped.get_elided_page_range(5)), [1, 2, 3, 4, 5, "…"]
+        )
+
+    @override_settings(
+        POSTS_COUNT_STRATEGY="capped", POSTS_PAGINATION_COUNT_LIMIT=11
+    )
+    def test_capped_count_continues_with_cursor(self):
+        """За последней посчитанной страницей лента идет по курсору."""
+        url = reverse("posts:index")
+        response = self.author_client.get(url + "?page=2")
+        page = response.context["page_obj"]
+        self.assertTrue(page.paginator.count_capped)
+        self.assertNotContains(response, "Последняя")
+        cursor = encode_cursor(page[-1])
+        self.assertContains(response, f"?cursor={cursor}")
+        rest = self.author_client.get(f"{url}?cursor={cursor}")
+        self.assertEqual(len(rest.context["page_obj"]), 2)
+
+
+@override_settings(POSTS_PAGINATION_COUNT_LIMIT=5)
+class CountStrategyTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user1")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Тестовый пост {i}", group=cls.group)
+            for i in range(13)
+        )
+        counters.reconcile()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_count_from_table_stats(self):
+        call_command("refresh_table_stats", stdout=StringIO())
+        response = self.client.get(reverse("posts:index"))
+        paginator = response.context["page_obj"].paginator
+        self.assertEqual(paginator.count, 13)
+        self.assertFalse(paginator.count_exact)
+        self.assertContains(response, "~13 записей")
+
+    def test_filtered_count_is_cached(self):
+        url = reverse("posts:group_list", args=(self.group.slug,))
+        self.assertEqual(
+            self.client.get(url).context["page_obj"].paginator.count, 13
+        )
+        Post.objects.create(author=self.user, text="Новый", group=self.group)
+        feed_cache.bump(feed_cache.GLOBAL_SCOPE)
+        paginator = self.client.get(url).context["page_obj"].paginator
+        self.assertEqual(paginator.count, 13)
+        self.assertFalse(paginator.count_exact)
+
+    def test_small_listing_counted_exactly(self):
+        with override_settings(POSTS_PAGINATION_COUNT_LIMIT=100):
+            response = self.client.get(reverse("posts:index"))
+        self.assertTrue(response.context["page_obj"].paginator.count_exact)
+        self.assertNotContains(response, "~13")
+
+    def test_admin_changelist_shows_estimate(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"group__id__exact": 1}
+        )
+        self.assertContains(response, "~13 ")
+        self.assertIsInstance(
+            response.context["cl"].paginator, EstimatedCountPaginator
+        )
+
 
 class FollowViewsTests(TestCase):
     @classmethod
@@ -383,3 +653,399 @@ class FollowViewsTests(TestCase):
         unfollow = self.authorized_client.get(reverse("posts:follow_index"))
         second_object = len(unfollow.context["page_obj"])
         self.assertEqual(second_object, 0)
+
+    def test_timeline_filled_on_follow_and_new_post(self):
+        """Лента подписок материализуется при подписке и публикации."""
+        Follow.objects.create(user=self.user_1, author=self.user)
+        new_post = Post.objects.create(author=self.user, text="Новый пост")
+        self.assertEqual(
+            set(self.user_1.timeline.values_list("post_id", flat=True)),
+            {self.post.id, new_post.id},
+        )
+        Follow.objects.filter(user=self.user_1, author=self.user).delete()
+        self.assertFalse(self.user_1.timeline.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_read_on_fetch(self):
+        """Посты авторов сверх лимита подписчиков читаются на лету."""
+        Follow.objects.create(user=self.user_1, author=self.user)
+        Post.objects.create(author=self.user, text="Пост знаменитости")
+        self.assertFalse(self.user_1.timeline.exists())
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        self.assertEqual(len(response.context["page_obj"]), 2)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_timeline_backfilled_below_limit(self):
+        """Посты, опубликованные сверх лимита, попадают в ленты,
+        когда автор возвращается к раскладке при записи.
+        """
+        Follow.objects.create(user=self.user_1, author=self.user)
+        Follow.objects.create(user=self.user_2, author=self.user)
+        post = Post.objects.create(author=self.user, text="Пост сверх лимита")
+        self.assertFalse(self.user_1.timeline.filter(post=post).exists())
+        Follow.objects.filter(user=self.user_2, author=self.user).delete()
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        self.assertIn(post, response.context["page_obj"])
+
+    def test_rebuild_timeline_command(self):
+        Follow.objects.create(user=self.user_1, author=self.user)
+        TimelineEntry.objects.all().delete()
+        call_command("rebuild_timeline", stdout=StringIO())
+        self.assertEqual(
+            list(self.user_1.timeline.values_list("post_id", flat=True)),
+            [self.post.id],
+        )
+
+
+class SearchViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user1")
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Пост {i} про котов" + " кот" * i)
+            for i in range(13)
+        )
+        cls.other = Post.objects.create(
+            author=cls.user, text="Про собак <script>"
+        )
+        cls.url = reverse("posts:search")
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {"q": query, **params})
+        return response.context["page_obj"]
+
+    def test_search_uses_correct_template(self):
+        response = self.client.get(self.url, {"q": "кот"})
+        self.assertTemplateUsed(response, "posts/search.html")
+
+    def test_keyset_pages_cover_all_matches(self):
+        """Выдача по релевантности проходится курсором без повторов."""
+        for order in ("rank", "new"):
+            with self.subTest(order=order):
+                first = self.search("котов", order=order)
+                self.assertEqual(len(first), 10)
+                second = self.search(
+                    "котов", order=order, cursor=first.next_cursor
+                )
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                ids = {post.id for post in first}
+                ids.update(post.id for post in second)
+                self.assertEqual(len(ids), 13)
+        ranked = [post.search_rank for post in self.search("кот")]
+        self.assertEqual(ranked, sorted(ranked))
+
+    def test_cursor_with_huge_id_returns_first_page(self):
+        cursor = urlsafe_base64_encode(b"1.0|" + b"9" * 30)
+        for order in ("rank", "new"):
+            with self.subTest(order=order):
+                page = self.search("котов", order=order, cursor=cursor)
+                self.assertEqual(len(page), 10)
+
+    def test_prefix_query_and_snippet(self):
+        page = self.search("соба")
+        self.assertEqual(list(page), [self.other])
+        self.assertEqual(
+            page[0].search_snippet, "Про <mark>собак</mark> &lt;script&gt;"
+        )
+
+    def test_operators_in_query_are_literal(self):
+        self.assertEqual(len(self.search('" OR NEAR(')), 0)
+        self.assertEqual(len(self.search("")), 0)
+
+    def test_index_follows_post_changes(self):
+        post = Post.objects.get(id=self.other.id)
+        post.text = "Про ежей"
+        post.save()
+        self.assertEqual(len(self.search("собак")), 0)
+        self.assertEqual(list(self.search("ежей")), [post])
+        post.delete()
+        self.assertEqual(len(self.search("ежей")), 0)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "собак"}
+        )
+        self.assertEqual(
+            list(response.context["cl"].result_list), [self.other]
+        )
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username="user1", first_name="Иван"
+        )
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Тестовый пост {i}", group=cls.group)
+            for i in range(3)
+        )
+        counters.reconcile()
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, **kwargs):
+        return self.client.get(reverse(name, kwargs=kwargs))
+
+    def test_cards_shared_between_feeds(self):
+        self.assertEqual(
+            self.get("posts:index")["X-Card-Cache"], "hit=0; miss=3"
+        )
+        response = self.get("posts:group_list", slug=self.group.slug)
+        self.assertEqual(response["X-Card-Cache"], "hit=3; miss=0")
+        response = self.get("posts:profile", username=self.user.username)
+        self.assertEqual(response["X-Card-Cache"], "hit=3; miss=0")
+
+    def test_cached_page_without_card_header(self):
+        self.assertEqual(
+            self.get("posts:index")["X-Card-Cache"], "hit=0; miss=3"
+        )
+        response = self.get("posts:index")
+        self.assertNotIn("X-Card-Cache", response)
+        self.assertContains(response, "Тестовый пост 0")
+
+    def test_card_rendered_again_after_post_edit(self):
+        self.get("posts:index")
+        post = Post.objects.first()
+        post.text = "Исправленный текст"
+        post.save()
+        response = self.get("posts:profile", username=self.user.username)
+        self.assertEqual(response["X-Card-Cache"], "hit=2; miss=1")
+        self.assertContains(response, "Исправленный текст")
+
+    def test_cards_follow_author_and_group_changes(self):
+        self.get("posts:index")
+        user = User.objects.get(id=self.user.id)
+        user.first_name = "Пётр"
+        user.save()
+        response = self.get("posts:index")
+        self.assertEqual(response["X-Card-Cache"], "hit=0; miss=3")
+        self.assertContains(response, "Пётр")
+        user.save(update_fields=["last_login"])
+        self.assertEqual(self.get("posts:index")["X-Cache"], "hit")
+        group = Group.objects.get(id=self.group.id)
+        group.slug = "new-slug"
+        group.save()
+        response = self.get("posts:index")
+        self.assertEqual(response["X-Card-Cache"], "hit=0; miss=3")
+        self.assertContains(response, "/group/new-slug/")
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user1")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        for i in range(13):
+            Post.objects.create(
+                author=cls.user, text=f"Тестовый пост {i}", group=cls.group
+            )
+        cls.urls = (
+            reverse("posts:api_posts"),
+            reverse("posts:api_group_posts", args=(cls.group.slug,)),
+            reverse("posts:api_profile_posts", args=(cls.user.username,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_pages(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                self.assertEqual(len(first["results"]), 10)
+                self.assertEqual(
+                    first["results"][0],
+                    {
+                        "id": 13,
+                        "text": "Тестовый пост 12",
+                        "pub_date": first["results"][0]["pub_date"],
+                        "author": "user1",
+                        "group": "test-slug",
+                        "image": None,
+                        "comments_count": 0,
+                    },
+                )
+                self.assertIsNone(first["previous"])
+                second = self.client.get(first["next"]).json()
+                self.assertEqual(len(second["results"]), 3)
+                self.assertIsNone(second["next"])
+
+    def test_not_modified_without_queries(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                last_modified = response["Last-Modified"]
+                etag = response["ETag"]
+                self.assertFalse(etag.startswith("W/"))
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                modified = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(modified.status_code, 304)
+
+    def test_etag_changes_with_feed(self):
+        url = reverse("posts:api_posts")
+        etag = self.client.get(url)["ETag"]
+        Post.objects.create(author=self.user, text="Новый пост")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["results"][0]["text"], "Новый пост")
+
+    def test_unknown_group_not_found(self):
+        response = self.client.get(
+            reverse("posts:api_group_posts", args=("missing",))
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user1")
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f"Пост {i}, с запятой")
+            for i in range(5)
+        ]
+        Comment.objects.create(post=cls.posts[0], author=cls.user, text="К")
+        Follow.objects.create(user=cls.staff, author=cls.user)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def export(self, kind, **params):
+        response = self.staff_client.get(
+            reverse("posts:export", args=(kind,)), params
+        )
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_ndjson_export(self):
+        lines = self.export("posts").decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        first = json.loads(lines[0])
+        self.assertEqual(first["id"], self.posts[0].id)
+        self.assertEqual(first["text"], "Пост 0, с запятой")
+        for kind in ("comments", "follows"):
+            with self.subTest(kind=kind):
+                self.assertEqual(len(self.export(kind).splitlines()), 1)
+
+    def test_incremental_gzip_csv_export(self):
+        data = self.export(
+            "posts", format="csv", since_id=self.posts[2].id, gzip="1"
+        )
+        rows = list(csv.reader(gzip.decompress(data).decode().splitlines()))
+        self.assertEqual(rows[0][:2], ["id", "pub_date"])
+        self.assertEqual(
+            [int(row[0]) for row in rows[1:]],
+            [post.id for post in self.posts[3:]],
+        )
+
+    def test_follows_export_rejects_since(self):
+        response = self.staff_client.get(
+            reverse("posts:export", args=("follows",)),
+            {"since": "2020-01-01T00:00:00"},
+        )
+        self.assertContains(response, "since_id", status_code=400)
+
+    def test_export_for_staff_only(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("posts:export", args=("posts",)))
+        self.assertEqual(response.status_code, 302)
+        response = self.staff_client.get(
+            reverse("posts:export", args=("users",))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "posts.ndjson")
+            call_command("export_data", "posts", "--output", output)
+            with open(output) as file:
+                self.assertEqual(len(file.readlines()), 5)
+
+
+class BenchmarkTests(TestCase):
+    def seed(self, *args):
+        call_command(
+            "seed_benchmark_data",
+            "--users=20",
+            "--groups=3",
+            "--posts=60",
+            "--comments=40",
+            *args,
+            stdout=StringIO(),
+        )
+
+    def test_seed_benchmark_data(self):
+        with tempfile.TemporaryDirectory() as media_root:
+            with self.settings(MEDIA_ROOT=media_root):
+                self.seed("--images=2", "--image-ratio=1")
+        self.assertEqual(User.objects.count(), 21)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertEqual(Post.objects.values("image").distinct().count(), 2)
+        self.assertGreater(Post.objects.dates("pub_date", "day").count(), 1)
+        self.assertTrue(Follow.objects.exists())
+        author = Post.objects.first().author
+        self.assertEqual(
+            author.stats.posts_count,
+            Post.objects.filter(author=author).count(),
+        )
+
+    def test_benchmark_views_baseline(self):
+        self.seed("--images=0")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        baseline = os.path.join(directory.name, "baseline.json")
+        call_command(
+            "benchmark_views",
+            "--repeat=2",
+            "--save",
+            baseline,
+            stdout=StringIO(),
+        )
+        with open(baseline) as file:
+            result = json.load(file)
+        self.assertEqual(
+            set(result["views"]),
+            {pattern.name for pattern in posts_urls.urlpatterns},
+        )
+        self.assertEqual(result["views"]["index"]["status"], 200)
+        result["views"]["index"]["queries"] = -1
+        with open(baseline, "w") as file:
+            json.dump(result, file)
+        with self.assertRaisesMessage(CommandError, "index: запросов -1"):
+            call_command(
+                "benchmark_views",
+                "--repeat=2",
+                "--only",
+                "index",
+                "--baseline",
+                baseline,
+                stdout=StringIO(),
+            )
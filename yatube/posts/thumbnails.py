@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connection, transaction
+
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile
+
+from . import cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+# Картинка, миниатюры которой не удалось создать, не ставится в очередь
+# повторно до THUMBNAIL_RETRY_TIMEOUT.
+FAILED_KEY = "thumbnail_failed:{}"
+
+
+class PrebuiltThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который умеет читать миниатюру
+    из KVStore, не создавая её.
+    """
+
+    def _prepare(self, file_, geometry_string, options):
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault("format", self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        """Варианты лежат рядом с оригиналом: posts/photo_480x170_<h>.jpg."""
+        key = tokey(source.key, geometry_string, serialize(options))
+        stem = os.path.splitext(source.name)[0]
+        extension = EXTENSIONS[options["format"]]
+        return f"{stem}_{geometry_string}_{key[:8]}.{extension}"
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        return default.kvstore.get(
+            self._prepare(file_, geometry_string, options)
+        )
+
+
+backend = PrebuiltThumbnailBackend()
+
+
+Variant = namedtuple("Variant", "format width height options")
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def is_supported(image_format):
+    return image_format != "WEBP" or features.check("webp")
+
+
+def variants(name):
+    """Варианты размера name для всех ширин и поддерживаемых форматов."""
+    options = dict(settings.POST_THUMBNAILS[name])
+    width, height = map(int, options.pop("geometry").split("x"))
+    widths = options.pop("widths", (width,))
+    options.pop("sizes", None)
+    for image_format in settings.POST_THUMBNAIL_FORMATS:
+        if not is_supported(image_format):
+            continue
+        for variant_width in widths:
+            yield Variant(
+                image_format,
+                variant_width,
+                round(height * variant_width / width),
+                {**options, "format": image_format},
+            )
+
+
+def geometry(variant):
+    return f"{variant.width}x{variant.height}"
+
+
+def build(image_name, variant):
+    """Создаёт вариант и сообщает, попал ли он в KVStore.
+
+    Нечитаемый исходник sorl только логирует и в KVStore не записывает.
+    """
+    backend.get_thumbnail(image_name, geometry(variant), **variant.options)
+    ready = backend.get_ready_thumbnail(
+        image_name, geometry(variant), **variant.options
+    )
+    return ready is not None
+
+
+def generate(image_name):
+    """Создаёт все варианты из POST_THUMBNAILS для одной картинки.
+
+    Возвращает False, если это не удалось; неудача запоминается.
+    """
+    try:
+        built = all(
+            build(image_name, variant)
+            for name in settings.POST_THUMBNAILS
+            for variant in variants(name)
+        )
+    except Exception:
+        logger.exception("Не удалось создать миниатюры для %s", image_name)
+        built = False
+    if not built:
+        default_cache.set(
+            FAILED_KEY.format(image_name),
+            True,
+            settings.THUMBNAIL_RETRY_TIMEOUT,
+        )
+        return False
+    return True
+
+
+def has_failed(image_name):
+    return default_cache.get(FAILED_KEY.format(image_name), False)
+
+
+def refresh_pages(image_name):
+    """Сбрасывает карточки и ленты постов с этой картинкой,
+    закешированные с заглушкой.
+    """
+    scopes = {f"image:{image_name}"}
+    for post in Post.objects.filter(image=image_name).select_related("author"):
+        scopes.update(cache.post_scopes(post))
+        scopes.add(f"post:{post.id}")
+    cache.bump(*scopes)
+
+
+def _run(image_name):
+    try:
+        if generate(image_name):
+            refresh_pages(image_name)
+    finally:
+        with _pending_lock:
+            _pending.discard(image_name)
+        connection.close()
+
+
+def _submit(image_name):
+    global _executor
+    with _pending_lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+    _executor.submit(_run, image_name)
+
+
+def schedule(image_name):
+    """Ставит картинку в очередь после фиксации транзакции."""
+    if not settings.THUMBNAIL_ASYNC:
+        generate(image_name)
+        return
+    transaction.on_commit(lambda: _submit(image_name))
+
+
+def delete(image_name):
+    """Удаляет картинку, ее миниатюры и записи KVStore.
+
+    Имена вне хранилища (например, абсолютные пути из фикстур) и уже
+    удаленные файлы пропускаются: это не должно ломать удаление поста.
+    """
+    try:
+        backend.delete(image_name)
+    except (OSError, SuspiciousFileOperation):
+        logger.warning("Не удалось удалить %s", image_name, exc_info=True)
+
+
+def thumbnail_names(image_name):
+    """Имена всех созданных миниатюр картинки по данным KVStore."""
+    source = ImageFile(image_name, default.storage)
+    keys = default.kvstore._get(source.key, identity="thumbnails") or []
+    thumbnails = (default.kvstore._get(key) for key in keys)
+    return [thumbnail.name for thumbnail in thumbnails if thumbnail]
+
+
+def get_ready(image, size):
+    """Готовые варианты {формат: [(ширина, миниатюра)]} или None.
+
+    Если хотя бы одного варианта нет, картинка ставится в очередь,
+    кроме картинок, для которых создание недавно не удалось.
+    """
+    ready = {}
+    for variant in variants(size):
+        # Ключи KVStore строятся по имени файла в хранилище по умолчанию,
+        # как и при генерации в generate().
+        thumbnail = backend.get_ready_thumbnail(
+            image.name, geometry(variant), **variant.options
+        )
+        if thumbnail is None:
+            if not has_failed(image.name):
+                schedule(image.name)
+            return None
+        ready.setdefault(variant.format, []).append((variant.width, thumbnail))
+    return ready
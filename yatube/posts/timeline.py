@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+def is_fanout_author(author_id):
+    followers = (
+        UserStats.objects.filter(user_id=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    )
+    return (followers or 0) <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def celebrity_ids(user):
+    """Авторы из подписок пользователя, посты которых читаются на лету."""
+    return list(
+        UserStats.objects.filter(
+            user__following__user=user,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list("user_id", flat=True)
+    )
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    if not is_fanout_author(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in follower_ids.iterator()
+    )
+
+
+def add_follow(follow):
+    if not is_fanout_author(follow.author_id):
+        return
+    posts = Post.objects.filter(author_id=follow.author_id).values_list(
+        "id", "pub_date"
+    )
+    _bulk_insert(
+        TimelineEntry(user_id=follow.user_id, post_id=post_id, pub_date=date)
+        for post_id, date in posts.iterator()
+    )
+
+
+def backfill_author(author_id):
+    """Раскладывает посты автора всем подписчикам.
+
+    Пока автор был выше TIMELINE_FANOUT_LIMIT, его посты читались на лету
+    и в ленты не попадали.
+    """
+    posts = list(
+        Post.objects.filter(author_id=author_id).values_list("id", "pub_date")
+    )
+    follower_ids = Follow.objects.filter(author_id=author_id).values_list(
+        "user_id", flat=True
+    )
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=date)
+        for user_id in follower_ids.iterator()
+        for post_id, date in posts
+    )
+
+
+def remove_follow(follow):
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id
+    ).delete()
+    # Вызывается после уменьшения followers_count: ровно на пороге автор
+    # только что вернулся к раскладке при записи.
+    followers = (
+        UserStats.objects.filter(user_id=follow.author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    )
+    if followers == settings.TIMELINE_FANOUT_LIMIT:
+        backfill_author(follow.author_id)
+
+
+def rebuild(users):
+    for user in users.iterator():
+        TimelineEntry.objects.filter(user=user).delete()
+        for follow in Follow.objects.filter(user=user).iterator():
+            add_follow(follow)
+
+
+# Ключ курсора ленты подписок (paginate(cursor_keys=...)).
+CURSOR_KEYS = ("feed_date", "feed_id")
+
+
+def feed(user, celebrities=None):
+    """Лента подписок: индексированный диапазон TimelineEntry
+    плюс посты авторов, для которых раскладка при записи отключена.
+
+    Посты упорядочены по feed_date, feed_id: без знаменитостей это
+    (pub_date, id) записи ленты, и курсор идет по индексу
+    (user, pub_date), иначе — (pub_date, id) самого поста.
+    celebrities — id таких авторов, по умолчанию из подписок user.
+    """
+    if celebrities is None:
+        celebrities = celebrity_ids(user)
+    if not celebrities:
+        posts = Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F("timeline_entries__pub_date"),
+            feed_id=F("timeline_entries__id"),
+        )
+    else:
+        # EXISTS по уникальному (user, post) вместо IN: SQLite идет по
+        # индексу (pub_date, id) постов без сортировки всей выборки.
+        entries = TimelineEntry.objects.filter(user=user, post=OuterRef("pk"))
+        posts = Post.objects.annotate(
+            in_timeline=Exists(entries),
+            feed_date=F("pub_date"),
+            feed_id=F("id"),
+        ).filter(Q(in_timeline=True) | Q(author_id__in=celebrities))
+    return posts.order_by("-feed_date", "-feed_id")
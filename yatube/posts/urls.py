@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = "posts"
 
@@ -9,12 +9,25 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
     path("profile/<str:username>/", views.profile, name="profile"),
+    path("search/", views.post_search, name="search"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path(
         "posts/<int:post_id>/comment/", views.add_comment, name="add_comment"
     ),
+    path("api/v1/posts/", api.posts, name="api_posts"),
+    path(
+        "api/v1/groups/<slug:slug>/posts/",
+        api.group_posts,
+        name="api_group_posts",
+    ),
+    path(
+        "api/v1/profile/<str:username>/posts/",
+        api.profile_posts,
+        name="api_profile_posts",
+    ),
+    path("export/<str:kind>/", views.export_data, name="export"),
     path("follow/", views.follow_index, name="follow_index"),
     path(
         "profile/<str:username>/follow/",
@@ -0,0 +1,35 @@
+from django.conf import settings
+
+from constants import POSTS_PER_PAGE
+
+from . import counts
+from .paginators import KEYS, CursorPaginator, WindowedPaginator
+
+
+def paginate(request, queryset, count=None, cursor_keys=KEYS):
+    """Возвращает страницу ленты.
+
+    Ссылки вида ?page=N всегда обслуживаются постраничным режимом,
+    ?cursor= и режим POSTS_PAGINATION = "cursor" — курсорным.
+    count — уже известное число записей (из счетчиков UserStats), иначе
+    оно берется по стратегии POSTS_COUNT_STRATEGY. cursor_keys — поля
+    позиции курсора, по которым упорядочен queryset.
+    """
+    cursor = request.GET.get("cursor")
+    page_number = request.GET.get("page")
+    if cursor is not None or (
+        settings.POSTS_PAGINATION == "cursor" and page_number is None
+    ):
+        paginator = CursorPaginator(queryset, POSTS_PER_PAGE, cursor_keys)
+        return paginator.get_page(cursor)
+    if count is None:
+        strategy = counts.get_strategy()
+    else:
+        strategy = counts.known(count)
+    paginator = WindowedPaginator(
+        queryset,
+        POSTS_PER_PAGE,
+        count_strategy=strategy,
+        cursor_keys=cursor_keys,
+    )
+    return paginator.get_page(page_number)
@@ -1,32 +1,40 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.dateparse import parse_datetime
 
 from constants import POSTS_PER_PAGE
 
+from . import counters, export, search, timeline
+from .cache import cache_feed
+from .cards import report_hit_rate
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Follow, Group, Post, User, UserStats
+from .utils import paginate
 
 
-@cache_page(20, key_prefix="index_page")
+@report_hit_rate
+@cache_feed("index")
 def index(request):
     post_list = Post.objects.select_related("author", "group")
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, post_list)
     context = {
         "page_obj": page_obj,
     }
     return render(request, "posts/index.html", context)
 
 
+@report_hit_rate
+@cache_feed("group:{slug}")
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group).select_related("author")
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.filter(group=group).select_related(
+        "author", "group"
+    )
+    page_obj = paginate(request, post_list)
     context = {
         "group": group,
         "page_obj": page_obj,
@@ -34,17 +42,19 @@ def group_posts(request, slug):
     return render(request, "posts/group_list.html", context)
 
 
+@report_hit_rate
+@cache_feed("profile:{username}")
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
     posts = author.posts.all().select_related("group")
-    posts_num = author.posts.count()
+    posts_num = counters.for_user(author).posts_count
     following = (
         request.user.is_authenticated
         and author.following.filter(user=request.user, author=author).exists()
     )
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, count=posts_num)
     context = {
         "page_obj": page_obj,
         "author": author,
@@ -54,12 +64,27 @@ def profile(request, username):
     return render(request, "posts/profile.html", context)
 
 
+def post_search(request):
+    query = request.GET.get("q", "").strip()
+    order = request.GET.get("order", "rank")
+    page_obj = search.search(
+        query, POSTS_PER_PAGE, request.GET.get("cursor"), order
+    )
+    context = {
+        "page_obj": page_obj,
+        "query": query,
+        "order": page_obj.paginator.order,
+    }
+    return render(request, "posts/search.html", context)
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    author_posts = Post.objects.filter(author=post.author)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), id=post_id
+    )
     form = CommentForm(request.POST or None)
     comments = post.comments.select_related("author")
-    posts_count = author_posts.count()
+    posts_count = counters.for_user(post.author).posts_count
     context = {
         "post": post,
         "posts_count": posts_count,
@@ -119,15 +144,15 @@ def add_comment(request, post_id):
 
 
 @login_required
+@report_hit_rate
 def follow_index(request):
-    follower = Follow.objects.filter(user=request.user).values_list(
-        "author_id", flat=True
+    posts = timeline.feed(request.user).select_related("author", "group")
+    posts_num = UserStats.objects.filter(
+        user__following__user=request.user
+    ).aggregate(total=Coalesce(Sum("posts_count"), 0))["total"]
+    page_obj = paginate(
+        request, posts, count=posts_num, cursor_keys=timeline.CURSOR_KEYS
     )
-    posts = Post.objects.filter(author_id__in=follower).select_related("group")
-    posts_num = posts.count()
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
     context = {
         "page_obj": page_obj,
         "posts_num": posts_num,
@@ -148,3 +173,35 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect("posts:follow_index")
+
+
+@staff_member_required
+def export_data(request, kind):
+    """Потоковая выгрузка для аналитики: NDJSON или CSV, по желанию gzip."""
+    if kind not in export.EXPORTS:
+        raise Http404
+    fmt = request.GET.get("format", "ndjson")
+    since = request.GET.get("since")
+    since_id = request.GET.get("since_id")
+    if fmt not in export.FORMATS:
+        return HttpResponseBadRequest("format: ndjson или csv")
+    if since is not None and kind == "follows":
+        return HttpResponseBadRequest(
+            "since: у подписок нет pub_date, используйте since_id"
+        )
+    if since is not None:
+        since = parse_datetime(since)
+        if since is None:
+            return HttpResponseBadRequest("since: дата в ISO 8601")
+    if since_id is not None:
+        if not since_id.isdigit():
+            return HttpResponseBadRequest("since_id: целое число")
+        since_id = int(since_id)
+    gzip = request.GET.get("gzip") == "1"
+    filename = f"{kind}.{fmt}" + (".gz" if gzip else "")
+    response = StreamingHttpResponse(
+        export.stream(kind, fmt, since, since_id, gzip),
+        content_type="application/gzip" if gzip else export.FORMATS[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
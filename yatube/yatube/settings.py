@@ -30,11 +30,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.QueryBudgetMiddleware",
+    "core.middleware.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -45,7 +49,8 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.templates.TimedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [TEMPLATES_DIR],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -61,6 +66,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "yatube.wsgi.application"
 
+# Разбирать все шаблоны при старте воркера (см. settings_production).
+TEMPLATE_WARMUP = False
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
@@ -105,8 +113,160 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Два уровня: LRU процесса (L1) перед общим для всех воркеров хоста
+# SQLite (L2). На нескольких хостах "shared" заменяется на memcached
+# или redis, см. settings_production.py.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    }
+        "BACKEND": "core.cache_backends.TwoTierCache",
+        "LOCATION": "default",
+        "OPTIONS": {
+            "L2": "shared",
+            "L1_MAX_ENTRIES": 1000,
+            "L1_TIMEOUT": 60,
+            "L1_CHECK_INTERVAL": 1,
+            # Версии лент и пользователи (core.auth) перезаписываются на
+            # месте, а блокировки страниц должны быть общими для процессов.
+            "L1_PREFIX_TIMEOUTS": {
+                "feed_version:": 1,
+                "auth_user:": 1,
+                "page_lock.": 0,
+            },
+        },
+    },
+    "shared": {
+        "BACKEND": "core.cache_backends.SQLiteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    },
+}
+
+# Сессия читается из общего кеша (L2 без L1: данные сессии меняются на
+# месте), в базу — только запись. "signed_cookies" хранит сессию в
+# подписанной cookie и не трогает ни кеш, ни базу.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "shared"
+
+# Пользователь запроса берется из кеша, см. core.auth. Срок короткий:
+# правки через QuerySet.update() без auth.forget_many видны через него.
+AUTHENTICATION_BACKENDS = ["core.auth.CachedModelBackend"]
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# "offset" — ?page=N, "cursor" — ?cursor=<token> без COUNT(*) и OFFSET.
+POSTS_PAGINATION = "offset"
+# Подсчет постов для номеров страниц (posts.counts): "exact" — COUNT(*),
+# "capped" — не больше порога, "cached" — COUNT(*) раз в POSTS_COUNT_TIMEOUT,
+# "estimated" — статистика ANALYZE для всей таблицы, иначе как "cached".
+POSTS_COUNT_STRATEGY = "estimated"
+# До этого числа записей всегда считается точно.
+POSTS_PAGINATION_COUNT_LIMIT = 10000
+POSTS_COUNT_TIMEOUT = 60 * 5
+
+# Строк за одно чтение курсора при потоковой выгрузке (export_data).
+EXPORT_CHUNK_SIZE = 2000
+# Записей в одной транзакции bulk_create при загрузке (import_posts).
+IMPORT_BATCH_SIZE = 1000
+
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты читаются при открытии ленты.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+
+# Страницы лент сбрасываются сигналами, поэтому срок жизни может быть долгим.
+FEED_CACHE_TIMEOUT = 60 * 60
+# Сколько секунд отдавать устаревшую копию, пока страницу пересобирают.
+FEED_CACHE_STALE_TIMEOUT = 60
+# Сколько браузер может не перезапрашивать ленту: сигналы до него
+# не доходят.
+FEED_BROWSER_MAX_AGE = 0
+# Карточки постов в лентах; ключ меняется при правке поста, автора, группы.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+COUNTERS_BATCH_SIZE = 500
+
+# Миниатюры создаются в фоне при сохранении поста, шаблоны только читают
+# готовые. Для каждой ширины из widths создаётся вариант в каждом формате
+# из POST_THUMBNAIL_FORMATS (WebP — если Pillow собран с его поддержкой).
+POST_THUMBNAILS = {
+    "card": {
+        "geometry": "960x339",
+        "widths": (480, 720, 960),
+        "sizes": "(max-width: 1000px) 100vw, 960px",
+        "crop": "center",
+        "upscale": True,
+    },
 }
+POST_THUMBNAIL_FORMATS = ("WEBP", "JPEG")
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+# Через сколько секунд повторять создание миниатюр, если оно не удалось.
+THUMBNAIL_RETRY_TIMEOUT = 60 * 60
+THUMBNAIL_KVSTORE = "core.thumbnail_kvstore.KVStore"
+THUMBNAIL_KVSTORE_PATH = os.path.join(BASE_DIR, "thumbnails.sqlite3")
+THUMBNAIL_KVSTORE_L1_ENTRIES = 5000
+THUMBNAIL_KVSTORE_L1_CHECK_INTERVAL = 1
+
+# Сколько SQL-запросов может сделать страница, включая сессию и
+# пользователя. Нарушения и повторы одной формы запроса (N+1) пишутся
+# в лог, а в тестах (core.testing.TestEnvironment, и под manage.py test,
+# и под pytest) валят тест.
+QUERY_BUDGET_ACTION = "log"
+QUERY_REPEAT_LIMIT = 3
+QUERY_BUDGETS = {
+    "posts:index": 4,
+    "posts:group_list": 5,
+    "posts:profile": 5,
+    "posts:search": 2,
+    "posts:post_detail": 4,
+    "posts:post_create": 9,
+    "posts:post_edit": 9,
+    "posts:add_comment": 7,
+    "posts:api_posts": 2,
+    "posts:api_group_posts": 3,
+    "posts:api_profile_posts": 3,
+    "posts:export": 2,
+    "posts:follow_index": 5,
+    "posts:profile_follow": 17,
+    "posts:profile_unfollow": 9,
+}
+TEST_RUNNER = "core.testing.BudgetTestRunner"
+
+# Гистограммы по view для /metrics/ (формат Prometheus, только staff).
+METRICS_ENABLED = True
+
+# Запросы дольше порога пишутся JSON-строками в SLOW_QUERY_LOG вместе
+# с EXPLAIN QUERY PLAN; одинаковые по форме — не чаще раза в интервал.
+# Отчет по логу: manage.py slow_query_report.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_SAMPLE_INTERVAL = 60
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, "slow_queries.log")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {
+        "slow_queries": {
+            "class": "logging.FileHandler",
+            "filename": SLOW_QUERY_LOG,
+            "formatter": "message",
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "core.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+# Профилирование запросов: доля PROFILING_SAMPLE_RATE и запросы staff
+# с ?_profile=1. Движок "sample" пишет свернутые стеки для flamegraph,
+# "cprofile" — .pstats. Хранятся последние PROFILING_KEEP файлов.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_ENGINE = "sample"
+PROFILING_INTERVAL = 0.001
+PROFILING_DIR = os.path.join(BASE_DIR, "profiles")
+PROFILING_KEEP = 100
@@ -0,0 +1,52 @@
+"""Боевые настройки: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+Шаблоны разбираются один раз на процесс (кешированный загрузчик) и
+прогреваются при старте воркера в wsgi.py. Перед выкладкой шаблоны
+проверяет python manage.py compile_templates.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, SESSION_ENGINE, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+
+ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "localhost").split(",")
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        "APP_DIRS": False,
+        "OPTIONS": {
+            **TEMPLATES[0]["OPTIONS"],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
+        },
+    },
+]
+
+TEMPLATE_WARMUP = True
+
+# Например django.contrib.sessions.backends.signed_cookies.
+SESSION_ENGINE = os.environ.get("DJANGO_SESSION_ENGINE", SESSION_ENGINE)
+
+# Общий L2 на несколько хостов, например
+# django.core.cache.backends.memcached.MemcachedCache и host:11211.
+if "DJANGO_SHARED_CACHE_BACKEND" in os.environ:
+    CACHES = {
+        **CACHES,
+        "shared": {
+            "BACKEND": os.environ["DJANGO_SHARED_CACHE_BACKEND"],
+            "LOCATION": os.environ["DJANGO_SHARED_CACHE_LOCATION"],
+        },
+    }